@@ -0,0 +1,193 @@
+"""
+Benchmarks for the transit cog's hot paths, run against synthetic OC Transpo payloads.
+
+Measures response parsing (`_get_trips_and_routes`, `_sort_routes`, `_index_destinations`),
+`BusDisplay` page building, and `fetch_trips` end to end against the local stand-in server,
+for everything from single-trip stops up to huge stations.
+
+Usage
+-----
+    python benchmarks/transit_bench.py [--quick]
+
+Must be run from the repository root (the cog loads its assets with relative paths).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Coroutine, Dict, Tuple
+
+import orjson
+from aiohttp import web
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# has to be set before the cog gets imported
+PORT = _free_port()
+os.environ.setdefault("OCTRANSPO_API", f"http://127.0.0.1:{PORT}/v2.0")
+
+from octranspo_standin import FIXTURES, load_fixture, make_app, make_payload  # noqa: E402
+from helper_cogs.transit import (  # noqa: E402
+    BadResponse,
+    BusDisplay,
+    OCTranspoError,
+    StopTable,
+    TokenBucket,
+    Transit,
+    _get_trips_and_routes,
+    _index_destinations,
+    _sort_routes,
+)
+
+SIZES: Dict[str, Tuple[int, int]] = {
+    "single trip": (1, 1),
+    "small stop": (3, 3),
+    "busy stop": (12, 3),
+    "station": (40, 3),
+    "huge station": (120, 3),
+}
+
+
+def timed(func: Callable[[], Any], *, seconds: float) -> Tuple[int, float]:
+    runs = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        func()
+        runs += 1
+
+    return runs, elapsed
+
+
+async def atimed(func: Callable[[], Coroutine[Any, Any, Any]], *, seconds: float) -> Tuple[int, float]:
+    runs = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        await func()
+        runs += 1
+
+    return runs, elapsed
+
+
+def report(name: str, runs: int, elapsed: float) -> None:
+    per_op = elapsed / runs * 1e6
+    print(f"  {name:<40} {runs / elapsed:>12,.0f} ops/s {per_op:>12,.1f} µs/op")
+
+
+def payloads() -> Dict[str, str]:
+    raw = {}
+    for path in sorted(FIXTURES.glob("*.json")):
+        raw[f"fixture {path.stem}"] = load_fixture(path.stem) or ""
+    for name, (routes, trips) in SIZES.items():
+        raw[name] = orjson.dumps(make_payload("0000", routes=routes, trips=trips, seed=0)).decode()
+
+    return raw
+
+
+def bench_parsing(*, seconds: float) -> None:
+    print("parsing (json -> sorted routes + destination index)")
+    for name, raw in payloads().items():
+        data = orjson.loads(raw)["GetRouteSummaryForStopResult"]
+        if not data["Routes"]["Route"]:
+            continue
+
+        def parse():
+            d = orjson.loads(raw)["GetRouteSummaryForStopResult"]
+            trips, routes = _get_trips_and_routes(d["Routes"]["Route"])
+            _sort_routes(routes)
+            _index_destinations(trips)
+
+        report(name, *timed(parse, seconds=seconds))
+
+
+async def bench_pages(*, seconds: float) -> None:
+    print("page building (BusDisplay)")
+    owner = SimpleNamespace(id=0, avatar=None)
+    stops = StopTable([])
+
+    async def no_fetch(_: str) -> Any:
+        raise RuntimeError("not used here")
+
+    for name, raw in payloads().items():
+        data = orjson.loads(raw)["GetRouteSummaryForStopResult"]
+        if not data["Routes"]["Route"]:
+            continue
+
+        async def first_page():
+            view = await BusDisplay(data=data, stops=stops, owner=owner, trip_fetcher=no_fetch)  # type: ignore
+            view.get_page(view.current_key)
+            view.stop()
+
+        async def every_page():
+            view = await BusDisplay(data=data, stops=stops, owner=owner, trip_fetcher=no_fetch)  # type: ignore
+            keys = [
+                *(f"r::{i}" for i in range(view._departure_page_count)),
+                *view._routes_by_key,
+                *(f"d:{dest}" for dest in view._trips_by_destination),
+            ]
+            for key in keys:
+                view.get_page(key)
+            view.stop()
+
+        report(f"{name} (first page)", *await atimed(first_page, seconds=seconds))
+        report(f"{name} (every page)", *await atimed(every_page, seconds=seconds))
+
+
+async def bench_fetching(*, seconds: float) -> None:
+    print("fetch_trips against the stand-in server")
+    runner = web.AppRunner(make_app(routes=12, trips=3))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", PORT)
+    await site.start()
+
+    cog = Transit(SimpleNamespace(transit_id="", transit_token=""))  # type: ignore
+    cog.api.limiter = TokenBucket(1e9, 1e9)  # we're measuring the cog here, not the rate limit
+
+    try:
+        async def uncached(stop: str) -> None:
+            try:
+                await cog._fetch_trips(stop)
+            except (OCTranspoError, BadResponse):
+                pass
+
+        for stop in ("3000", "7659", "1234", "6666", "5555", "1111"):
+            report(f"stop {stop} (uncached)", *await atimed(lambda: uncached(stop), seconds=seconds))
+
+        async def burst() -> None:
+            cog.trip_cache.clear()
+            await asyncio.gather(*(cog.fetch_trips("3000") for _ in range(50)))
+
+        report("50 concurrent lookups, one stop", *await atimed(burst, seconds=seconds))
+        print(f"  trip cache: {cog.trip_cache.stats}")
+        print(f"  api client: {cog.api.stats}")
+    finally:
+        await cog.api.close()
+        await runner.cleanup()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="run each benchmark for 0.2s rather than 1s")
+    args = parser.parse_args()
+    seconds = 0.2 if args.quick else 1.0
+
+    bench_parsing(seconds=seconds)
+    await bench_pages(seconds=seconds)
+    await bench_fetching(seconds=seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,7 +9,7 @@ import sys
 import time
 import traceback
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Coroutine, List, Tuple, TypeVar, TYPE_CHECKING
+from typing import Any, Callable, Coroutine, List, Sequence, Tuple, TypeVar, TYPE_CHECKING
 
 # <-- discord imports -->
 import discord
@@ -20,7 +20,6 @@ from discord.ext import commands
 # <-- google imports -->
 from google_auth_oauthlib.flow import Flow
 from google.auth.exceptions import RefreshError
-from google.oauth2.credentials import Credentials
 
 # <-- database imports -->
 import asyncpg
@@ -35,9 +34,12 @@ from fuzzy_match import match
 from utils import (
     BotColours,
     BotEmojis,
+    CLASSROOM_SCOPES,
+    ClassroomAccounts,
     Config,
     Embed,
     GClassLogging,
+    GuildDirectory,
     NGKContext,
     PrintColours,
     db_init,
@@ -57,7 +59,6 @@ if TYPE_CHECKING:
 
     from topgg.webhook import WebhookManager
 
-    from cogs.browser import Browser
     from utils import PostgresPool, Secrets
 
     T = TypeVar("T")
@@ -81,10 +82,29 @@ start = time.monotonic()
 asyncio.BaseEventLoop.call_soon = new_call_soon
 DiscordWebSocket.identify = mobile
 
-logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.ERROR)
+# <-- sharding -->
+# the bot can be split into clusters, processes that each run a range of the shards, e.g.
+#   SHARD_COUNT=16 CLUSTER_SHARDS=0-7 python bot.py
+#   SHARD_COUNT=16 CLUSTER_SHARDS=8-15 python bot.py
+# without these, one process runs every shard, using however many discord recommends
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if "SHARD_COUNT" in os.environ else None
+CLUSTER_SHARDS = os.environ.get("CLUSTER_SHARDS", None)
 
 
-class Amaze(commands.Bot):
+def parse_shards(spec: str) -> List[int]:
+    """
+    Parses a list of shard IDs given as ranges and/or single IDs, e.g. `0-3,8,10-11`.
+    """
+
+    shards: List[int] = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        shards += range(int(first), int(last or first) + 1)
+
+    return sorted(set(shards))
+
+
+class Amaze(ClassroomAccounts, commands.AutoShardedBot):
     """
     The sexiest bot of all time.
     """
@@ -95,12 +115,7 @@ class Amaze(commands.Bot):
 
     LOGIN_CMD_ID = 1034690162585763840
     LOGOUT_CMD_ID = 1034690162585763841
-    SCOPES = [
-        "https://www.googleapis.com/auth/classroom.announcements.readonly",
-        "https://www.googleapis.com/auth/classroom.courses.readonly",
-        "https://www.googleapis.com/auth/classroom.courseworkmaterials.readonly",
-        "https://www.googleapis.com/auth/classroom.student-submissions.me.readonly",
-    ]
+    SCOPES = CLASSROOM_SCOPES
 
     logger = logging.getLogger(__name__)
 
@@ -117,11 +132,17 @@ class Amaze(commands.Bot):
 
     user: discord.ClientUser
     owner_ids: List[int]
-    get_guild: Callable[[int], discord.Guild]
+    get_guild: Callable[[int], discord.Guild | None]
     get_channel: Callable[[int], discord.abc.Messageable]
     blacklist: Config[int]
+    guild_directory: GuildDirectory
+
+    def __init__(self, *, shard_count: int | None = SHARD_COUNT, shard_ids: Sequence[int] | None = None):
+        if shard_ids is None and CLUSTER_SHARDS is not None:
+            shard_ids = parse_shards(CLUSTER_SHARDS)
+        if shard_ids is not None and shard_count is None:
+            raise RuntimeError("SHARD_COUNT has to be set when running a cluster of shards")
 
-    def __init__(self):
         allowed_mentions = discord.AllowedMentions.all()
         intents = discord.Intents.default()
         if sys.platform == "win32":
@@ -145,6 +166,8 @@ class Amaze(commands.Bot):
                 650882112655720468,  # toilet
                 1091888723060326470,  # sam
             ],
+            shard_count=shard_count,
+            shard_ids=list(shard_ids) if shard_ids is not None else None,
         )
 
         os.environ["JISHAKU_HIDE"] = "True"
@@ -157,74 +180,37 @@ class Amaze(commands.Bot):
         self.guild_limit = []
         self.uptime = datetime.now(tz=timezone(timedelta(hours=-4 if is_dst() else -5)))
 
+        self.setup_accounts()
+
         self.tree.interaction_check = self.tree_interaction_check
         self.tree.on_error = self.on_app_command_error
         self.add_commands()
 
-    def is_blacklisted(self, obj: Snowflake) -> bool:
-        return obj.id in self.blacklist
-
-    async def remove_access(self, user_id: int):
+    @property
+    def cluster_name(self) -> str:
+        """
+        :class:`str` Names the shards this process runs, for telling the clusters apart in logs
         """
-        Revokes a user's access on both the bot's end as well as Google's end.
 
-        Parameters
-        ----------
-        user_id: `int`
-            The ID of the user to revoke.
+        if self.shard_ids is None:
+            return "all shards"
 
-        Raises
-        ------
-        `RuntimeError`
-            The user was not found.
-        """
+        return f"shards {min(self.shard_ids)}-{max(self.shard_ids)} of {self.shard_count}"
 
-        try:
-            cog: Browser = self.get_cog("Browser")  # type: ignore
-            del cog.course_cache[user_id]
-        except KeyError:
-            pass
+    async def guild_count(self) -> int:
+        """
+        Counts the bot's guilds over every shard, including the ones run by other clusters.
+        """
 
-        q = """DELETE FROM authorized
-                WHERE user_id = $1 RETURNING expiry, credentials
-            """
-        data = await self.db.fetchrow(q, user_id)
-        if not data:
-            raise RuntimeError("Could not find user.")
-        else:
-            creds = Credentials.from_authorized_user_info(data["credentials"])
-            creds.expiry = data["expiry"]
-
-            names = self.table_names
-            names.remove("authorized")
-            for table in names:
-                q = (
-                    """DELETE FROM %s
-                        WHERE user_id = $1
-                    """
-                    % table
-                )
-                await self.db.execute(q, user_id)
+        return await self.guild_directory.count(self.shard_count or 1)
 
-        assert self.session is not None
-        await self.session.post(
-            "https://oauth2.googleapis.com/revoke",
-            data={"token": creds.token},
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
+    def is_blacklisted(self, obj: Snowflake) -> bool:
+        return obj.id in self.blacklist
 
     @property
     def db(self) -> PostgresPool:
         return self._db  # type: ignore
 
-    @property
-    def table_names(self) -> List[str]:
-        """
-        List[:class:`str`] A list of names of database tables used for various features
-        """
-
-        return self._table_names.copy()
-
     async def load_extension(self, name: str) -> None:
         await super().load_extension(name)
 
@@ -252,16 +238,14 @@ class Amaze(commands.Bot):
             socket_connect_timeout=60.0,
             socket_timeout=60.0,
         )
+        self.guild_directory = GuildDirectory(self.redis, "gclass")
         self.logger.info("%sdatabases connected", PrintColours.GREEN)
 
         self.loop.create_task(self.first_ready()).add_done_callback(
             lambda exc: self.logger.error(traceback.format_exc()) if exc.exception() else None
         )
 
-        q = """SELECT tablename FROM pg_tables
-                WHERE tableowner = 'gdkid'
-            """
-        self._table_names = [i[0] for i in await self.db.fetch(q)]
+        await self.load_table_names()
         self.avatar_bytes = await self.user.avatar.read() if self.user.avatar else b""
 
         for extension in self.init_extensions:
@@ -269,7 +253,9 @@ class Amaze(commands.Bot):
 
     async def first_ready(self):
         await self.wait_until_ready()
-        self.logger.info("%sLogged in as: %s : %d", PrintColours.PURPLE, self.user, self.user.id)
+        self.logger.info(
+            "%sLogged in as: %s : %d (%s)", PrintColours.PURPLE, self.user, self.user.id, self.cluster_name
+        )
 
         await self.change_presence(status=discord.Status.online, activity=None)
 
@@ -279,23 +265,31 @@ class Amaze(commands.Bot):
         self.error_logs = await self.fetch_webhook(996132218936238172)
 
         end = time.monotonic()
-        e = Embed(description=f"❯❯  started up in ~`{round(end - start, 1)}s`")
+        e = Embed(description=f"❯❯  started up {self.cluster_name} in ~`{round(end - start, 1)}s`")
         await owner.send(embed=e)
 
         await self.db.execute("SELECT 1")  # wake it up ig
 
+    async def on_shard_ready(self, shard_id: int):
+        # this shard's guilds are all cached now, so whatever's in redis for it can be brought up to date
+        await self.guild_directory.sync_shard(shard_id, (g for g in self.guilds if g.shard_id == shard_id))
+
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            await self.guild_directory.remove(before)
+            await self.guild_directory.add(after)
+
     async def on_guild_join(self, guild: discord.Guild):
+        await self.guild_directory.add(guild)
+
         if not hasattr(self, "guild_logs"):  # discord bug...?
             return
 
         if self.is_blacklisted(guild):
             return await guild.leave()
 
-        counter = 0
-        for server in self.guilds:
-            if server.owner_id == guild.owner_id:
-                counter += 1
-        if counter > 2:
+        # the owner's other guilds could be on shards that another cluster's running
+        if guild.owner_id and await self.guild_directory.owned_by(guild.owner_id) > 2:
             assert guild.owner_id
             owner = await guild.fetch_member(guild.owner_id)
             await owner.send(
@@ -306,7 +300,7 @@ class Amaze(commands.Bot):
 
         e = Embed(colour=BotColours.green)
         e.set_author(
-            name=f"Guild Joined ({len(self.guilds)} servers)",
+            name=f"Guild Joined ({await self.guild_count()} servers)",
             icon_url="https://cdn.discordapp.com/emojis/816263605686894612.png?size=160",
         )
         e.add_field(name="Guild Name", value=guild.name)
@@ -322,6 +316,8 @@ class Amaze(commands.Bot):
         await self.guild_logs.send(embed=e)
 
     async def on_guild_remove(self, guild: discord.Guild):
+        await self.guild_directory.remove(guild)
+
         if not hasattr(self, "guild_logs"):  # discord bug...?
             return
 
@@ -334,7 +330,7 @@ class Amaze(commands.Bot):
 
         e = Embed(colour=BotColours.red)
         e.set_author(
-            name=f"Guild Left ({len(self.guilds)} servers)",
+            name=f"Guild Left ({await self.guild_count()} servers)",
             icon_url="https://cdn.discordapp.com/emojis/816263605837103164.png?size=160",
         )
         e.add_field(name="Guild Name", value=guild.name)
@@ -381,6 +377,7 @@ class Amaze(commands.Bot):
                     WHERE user_id = $1
                 """
             await self.db.execute(q, interaction.user.id)
+            await self.invalidate_classrooms(interaction.user.id)
 
         if isinstance(error, (CheckFailure, RefreshError)):
             return await method(f"you need to be logged in, you can do so with </login:{self.LOGIN_CMD_ID}>", ephemeral=True)
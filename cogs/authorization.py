@@ -45,6 +45,9 @@ class Authorization(commands.Cog):
                 ephemeral=True,
             )
 
+        # whatever's loaded for them is from an account they're no longer logged into
+        await self.client.invalidate_classrooms(interaction.user.id)
+
         MESSAGE = (
             "\N{WAVING HAND SIGN} hey! please go to [this link](%s) "
             f"to authorize with google, the link will expire "
@@ -19,7 +19,7 @@ from discord.ui import (
 
 from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build, HttpError
+from googleapiclient.errors import HttpError
 
 from utils import (
     BasePages,
@@ -27,8 +27,7 @@ from utils import (
     BotColours,
     Confirm,
     Embed,
-    ExpiringDict,
-    GoogleChunker,
+    ClassroomClient,
     View,
     cap,
     format_google_time,
@@ -40,7 +39,7 @@ if TYPE_CHECKING:
     from discord.ui import Item
 
     from bot import Amaze
-    from utils import Attachment, Course, CourseWork, Resource
+    from utils import Attachment, Course, CourseWork, StudentSubmissions
 
 
 KT = TypeVar("KT")
@@ -56,6 +55,9 @@ ICONS: Dict[str, str] = {
     "posted": "https://i.vgy.me/q8ExVs.png",
 }
 
+PREFETCH_PAGES = 3  # pages past the one being shown that get built in the background
+SUBMISSION_LOOKUPS = 4  # submission lookups a single menu can have running at once
+
 
 def get_due_date(assignment: CourseWork) -> datetime | None:
     if not (due := assignment.get("dueDate", None)):
@@ -115,9 +117,9 @@ class CoursePages(BasePages, auto_defer=False):
         self,
         interaction: Interaction,
         courses: List[Course],
-        service: Resource,
+        classroom: ClassroomClient,
     ):
-        self._resource = service
+        self._classroom = classroom
 
         self._interaction = interaction
 
@@ -200,7 +202,7 @@ class ClassPicker(Select[CoursePages]):
             assignments = None
             course = next(filter(lambda i: i["id"] == self.values[0], chain.from_iterable(self.view._courses)))
 
-        menu = ClassHome(self.view, interaction, course, self.view._resource, assignments)
+        menu = ClassHome(self.view, interaction, course, self.view._classroom, assignments)
         menu.original_message = self.view.original_message
 
         e = Embed(
@@ -217,11 +219,11 @@ class ClassHome(GoBack[CoursePages], auto_defer=True):
         homepage: CoursePages,
         interaction: Interaction,
         course: Course,
-        service: Resource,
+        classroom: ClassroomClient,
         assignments_from_cache: List[CourseWork] | None = None,
     ):
         self._home = homepage
-        self._resource = service
+        self._classroom = classroom
         self._course = course
         self._interaction = interaction
         self._assignments = assignments_from_cache
@@ -230,17 +232,9 @@ class ClassHome(GoBack[CoursePages], auto_defer=True):
 
         super().__init__(homepage=homepage)
 
-    def run_google(self, service: Resource, nextPageToken: str | None = None):  # all of the google libs are sync
-        if nextPageToken is not None:
-            extras = {"pageToken": nextPageToken, "pageSize": 50}
-        else:
-            extras = {"pageSize": 10}
-
-        return (
-            service.courses()
-            .courseWork()
-            .list(courseId=self._course["id"], orderBy="updateTime desc, dueDate desc", **extras)
-            .execute()
+    async def get_course_work(self, **params) -> Dict:
+        return await self._classroom.get(
+            f"courses/{self._course['id']}/courseWork", orderBy="updateTime desc, dueDate desc", **params
         )
 
     @button(label="setup webhook", style=discord.ButtonStyle.primary)
@@ -317,7 +311,7 @@ class ClassHome(GoBack[CoursePages], auto_defer=True):
             e = Embed(description=f"{BotEmojis.LOADING} fetching data...")
             await interaction.edit_original_response(embed=e, view=None)
             try:
-                assignments = await asyncio.to_thread(self.run_google, service=self._resource)
+                assignments = await self.get_course_work(pageSize=10)
             except HttpError:
                 e = Embed(
                     description="you can't view assignments from a course owned by your own account."
@@ -337,7 +331,7 @@ class ClassHome(GoBack[CoursePages], auto_defer=True):
 
         content = None
         menu: ClassMenu = await ClassMenu().async_init(
-            self._home, self._interaction, self._course, assignments, self._resource
+            self._home, self._interaction, self._course, assignments, self._classroom
         )
         if menu.pages[0].colour:
             content = ClassMenu.get_content(assignments[0])
@@ -346,39 +340,45 @@ class ClassHome(GoBack[CoursePages], auto_defer=True):
         if not next_page:
             return  # we don't need to worry about fetching the remaining data
 
-        assignment_chunks: GoogleChunker[CourseWork] = GoogleChunker(
-            self.client.loop, self.run_google, next_page, self._resource  # type: ignore
+        assignment_chunks = self._classroom.course_work(
+            self._course["id"], orderBy="updateTime desc, dueDate desc", pageSize=50, pageToken=next_page
         )
         async for assignments in assignment_chunks:
-            menu._assignments += assignments
-
-            for assignment in assignments:
-                menu._pages.append(await menu.make_embed(assignment))
+            menu.add_assignments(assignments)
 
 
 class ClassMenu(BasePages, auto_defer=False):
     _home: CoursePages
-    _resource: Resource
+    _classroom: ClassroomClient
     _course: Course
 
+    # pages are only built once they're about to be shown, so the ones that haven't been yet are left as `None`
+    _pages: List[Embed | None]  # type: ignore
+    _building: Dict[int, asyncio.Task[Embed]]
+    _lookups: asyncio.Semaphore
+
     async def async_init(
         self,
         homepage: CoursePages,
         interaction: Interaction,
         course: Course,
         assignments: List[CourseWork],
-        service: Resource,
+        classroom: ClassroomClient,
     ):
         self._home = homepage
-        self._resource = service
+        self._classroom = classroom
         self._course = course
 
         self._interaction = interaction
 
-        self._assignments = assignments
-        for assignment in assignments:
-            page = await self.make_embed(assignment)
-            self._pages.append(page)
+        self._assignments = []
+        self._pages = []
+        self._building = {}
+        self._lookups = asyncio.Semaphore(SUBMISSION_LOOKUPS)
+
+        self.add_assignments(assignments)
+        await self.load_page(0)
+        self.prefetch(0)
 
         if not self._home.cache.get(course["id"], None):
             self._home.cache[course["id"]] = assignments, course
@@ -400,23 +400,46 @@ class ClassMenu(BasePages, auto_defer=False):
 
         return self
 
-    async def make_embed(self, assignment: CourseWork) -> Embed:
-        def run_google(assignmentId):  # all google libs are sync
-            submissions = (
-                service.courses()
-                .courseWork()
-                .studentSubmissions()
-                .list(
-                    courseId=self._course["id"],
-                    courseWorkId=assignmentId,
-                    userId="me",
-                )
-                .execute()
-            )
+    def add_assignments(self, assignments: List[CourseWork]) -> None:
+        self._assignments += assignments
+        self._pages += [None] * len(assignments)
 
-            return submissions["studentSubmissions"][0]
+    def _forget_failed(self, index: int, task: asyncio.Task[Embed]) -> None:
+        if task.cancelled() or task.exception():
+            self._building.pop(index, None)  # so it gets another go next time it's needed
+
+    def _build_page(self, index: int) -> asyncio.Task[Embed]:
+        if (task := self._building.get(index, None)) is None:
+            task = self._building[index] = asyncio.create_task(self.make_embed(self._assignments[index]))
+            task.add_done_callback(partial(self._forget_failed, index))
+
+        return task
+
+    async def load_page(self, index: int) -> Embed:
+        """
+        Builds the page at `index` if it hasn't been already, waiting on it if it's already being built.
+        """
+
+        if (page := self._pages[index]) is None:
+            page = self._pages[index] = await asyncio.shield(self._build_page(index))
+
+        return page
+
+    def prefetch(self, index: int) -> None:
+        """
+        Starts building the next few pages after `index` in the background.
+        """
+
+        for i in range(index + 1, min(index + 1 + PREFETCH_PAGES, len(self._assignments))):
+            if self._pages[i] is None:
+                self._build_page(i)
+
+    async def make_embed(self, assignment: CourseWork) -> Embed:
+        async def get_submission(assignmentId) -> StudentSubmissions:
+            path = f"courses/{self._course['id']}/courseWork/{assignmentId}/studentSubmissions"
+            async with self._lookups:  # the ones running at the same time still go out in one batch request
+                return (await self._classroom.get(path, batch=True, userId="me"))["studentSubmissions"][0]
 
-        service = self._resource
         timestamp = format_google_time(assignment)
 
         assignment_response = assignment["workType"].lower().replace("_", " ")
@@ -436,7 +459,7 @@ class ClassMenu(BasePages, auto_defer=False):
         name = value = ""
         if due_date := get_due_date(assignment):
             if (submission := assignment.get("studentSubmissions", None)) is None:
-                submission = await asyncio.to_thread(run_google, assignment["id"])
+                submission = await get_submission(assignment["id"])
 
             state = submission["state"]
             worktype = submission["courseWorkType"]
@@ -498,8 +521,18 @@ class ClassMenu(BasePages, auto_defer=False):
 
     async def after_callback(self, interaction: Interaction, item: Item):
         if item not in (self.return_home, self.view_attachments):
+            if self._pages[self.current_page] is None:
+                # building it can take longer than discord gives us to respond
+                await interaction.response.defer()
+
+            await self.load_page(self.current_page)
+            self.prefetch(self.current_page)
+
             self.update_components()
-            await interaction.response.edit_message(**self.edit_kwargs)
+            if interaction.response.is_done():
+                await interaction.edit_original_response(**self.edit_kwargs)
+            else:
+                await interaction.response.edit_message(**self.edit_kwargs)
 
             self._home._refresh_timeout()  # refresh CoursePages object
 
@@ -547,22 +580,27 @@ class ClassMenu(BasePages, auto_defer=False):
         await self._home.start(interaction=interaction, edit_existing=True)
         self.stop()
 
+        for task in self._building.values():
+            task.cancel()
+
     @button(label="view assignment materials", style=discord.ButtonStyle.primary, row=1)
     async def view_attachments(self, interaction: Interaction, button: Button):
         ass = self._assignments[self.current_page]
         self._parent = True
 
         view = AttachmentsView(
-            homepage=self, attachments=ass["materials"], service=self._resource, content=self.original_message.content
+            homepage=self, attachments=ass["materials"], classroom=self._classroom, content=self.original_message.content
         )
         view.original_message = self.original_message
         await interaction.response.edit_message(view=view)
 
 
 class AttachmentsView(GoBack[ClassMenu], auto_defer=True):
-    def __init__(self, homepage: ClassMenu, attachments: List[Attachment], service: Resource, content: str | None = None):
+    def __init__(
+        self, homepage: ClassMenu, attachments: List[Attachment], classroom: ClassroomClient, content: str | None = None
+    ):
         self._home = homepage
-        self._resource = service
+        self._classroom = classroom
 
         self._content = content
 
@@ -612,7 +650,7 @@ class Browser(commands.Cog):
     def __init__(self, client: Amaze):
         self.client = client
 
-        self.course_cache: ExpiringDict[int, List[Course]] = ExpiringDict(300)
+        self.course_cache = client.course_cache
 
     @command(name="courses")
     @is_logged_in()
@@ -622,46 +660,38 @@ class Browser(commands.Cog):
         lists your courses. you can also pick on a course to view specific things
         """
 
-        def run_google_service(credentials) -> Resource:  # all of the google libs are sync
-            creds = Credentials.from_authorized_user_info(credentials, scopes=self.client.SCOPES)
-            return build("classroom", "v1", credentials=creds)
-
-        def run_google_courses(nextPageToken=None) -> Dict:  # all of the google libs are sync
-            kwargs = {"pageSize": 50}
-            if nextPageToken is not None:
-                kwargs["pageToken"] = nextPageToken
-
-            return service.courses().list(**kwargs).execute()
-
-        data = interaction.extras["credentials"]
-
         next_page: str | None = None
-        service = await asyncio.to_thread(run_google_service, data)
+        classroom: ClassroomClient = interaction.extras["classroom"]
 
-        if not (courses := self.course_cache.get(interaction.user.id, None)):
+        if (cached := await self.course_cache.get(interaction.user.id)) is not None:
+            courses, stale = cached
+            if stale:
+                self.course_cache.refresh(interaction.user.id, classroom)  # they'll get the fresh ones next time
+        else:
             await interaction.response.defer(ephemeral=True)
-            courses = await asyncio.to_thread(run_google_courses)
+            courses = await classroom.get("courses", pageSize=50)
             next_page = courses.get("nextPageToken", None)
             courses = courses.get("courses", [])
 
-        self.course_cache[interaction.user.id] = courses
+            if not next_page:
+                await self.course_cache.set(interaction.user.id, courses)
 
         if not courses:
             method = interaction.response.send_message if not interaction.response.is_done() else interaction.followup.send
             return await method(embed=Embed(description="no courses to display"), ephemeral=True)
 
-        menu = CoursePages(interaction, courses, service)
+        menu = CoursePages(interaction, courses, classroom)
         await menu.start()
 
         if not next_page:
             return  # we don't need to worry about fetching the remaining data
 
-        course_chunks: GoogleChunker[Course] = GoogleChunker(self.client.loop, run_google_courses, next_page)
-        async for courses in course_chunks:
+        all_courses = list(courses)
+        async for courses in classroom.courses(pageSize=50, pageToken=next_page):
             if not courses:
                 break  # shouldn't happen but with google, you never know
 
-            self.course_cache[interaction.user.id] += courses
+            all_courses += courses
 
             last_embed_slots_remaining = menu.COURSES_PER_PAGE - len(menu.pages[-1].fields)
             for _ in range(last_embed_slots_remaining):
@@ -673,6 +703,8 @@ class Browser(commands.Cog):
 
             menu.courses_to_pages(courses=courses)
 
+        await self.course_cache.set(interaction.user.id, all_courses)
+
 
 async def setup(client: Amaze):
     await client.add_cog(Browser(client=client))
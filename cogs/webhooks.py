@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import sys
+import time
+from contextlib import aclosing
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from itertools import chain
-from typing import Callable, Dict, List, Tuple, TYPE_CHECKING
+from typing import Any, Collection, Dict, Iterable, List, Tuple, TYPE_CHECKING
 
+import aiohttp
 import discord
 from discord import Webhook
 from discord.app_commands import checks, command
@@ -15,16 +18,16 @@ from discord.http import INTERNAL_API_VERSION
 from discord.ui import Button, Select
 
 from google.auth.exceptions import RefreshError
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build, HttpError
+from googleapiclient.errors import HttpError
 
 from cogs.browser import AttachmentsView, get_due_date, ICONS
 from utils import (
     BasePages,
     BotColours,
-    CappedDict,
+    ClassroomClient,
     Confirm,
     Embed,
+    ShardLeases,
     PrintColours,
     View,
     cap,
@@ -37,13 +40,41 @@ if TYPE_CHECKING:
     from discord.ui import Item
 
     from bot import Amaze
-    from utils import Attachment, Post, Resource, WebhookData
+    from utils import Attachment, Post, WebhookData
+    from webhook_worker import WebhookWorker
+
+    # the poller runs in the bot if there aren't any workers running it
+    PollerHost = Amaze | WebhookWorker
 
 DEL_QUERY = """DELETE FROM webhooks
                 WHERE user_id = $1
                 AND course_id = $2
                 AND channel_id = $3"""
 
+POLL_INTERVAL = 10  # minutes
+POLL_WORKERS = 16  # webhooks being polled at once, overall
+POLL_PER_USER = 10  # courses being polled at once using the same google account, these go out in the same batch
+POLL_SHARDS = 16  # webhooks are split up by course into this many shards, which are handed out between workers
+POLL_LEASES = "webhooks"  # where the workers coordinate in redis
+POLL_LAST_STARTED = f"{POLL_LEASES}:last_started"  # shard -> when its last poll started, whichever process ran it
+
+POLL_PAGE_SIZE = 20  # posts per page when catching a stream up to its watermark
+POLL_MAX_PAGES = 10  # pages read from one stream per cycle, anything past this is older than we care to post
+
+# post kind -> (path under the course, key the posts are listed under)
+POST_STREAMS = {
+    "announcement": ("announcements", "announcements"),
+    "material": ("courseWorkMaterials", "courseWorkMaterial"),
+    "assignment": ("courseWork", "courseWork"),
+}
+POST_KINDS = tuple(POST_STREAMS)
+
+# discord's limits on a single webhook message
+MESSAGE_MAX_EMBEDS = 10
+MESSAGE_MAX_CHARS = 6000  # across all of its embeds
+MESSAGE_MAX_BUTTONS = 25
+DELIVERY_MAX_RETRIES = 3  # times a message is retried after getting ratelimited
+
 
 @dataclass(init=False, slots=True)
 class EmbedWithPostData:
@@ -74,175 +105,583 @@ class EmbedWithPostData:
         return self.assignment_response or self.type
 
 
-@tasks.loop(minutes=10)
-async def fetch_posts(client: Amaze):
-    def run_google() -> Tuple[Post]:  # all google libs are sync
-        kwargs = {"courseId": webhook["course_id"], "pageSize": 5}
-        start = len(webhook) - 3
-        courses: Resource = service.courses()
-        _: Callable[[Resource], Dict[str, Post]] = lambda item: item.list(**kwargs).execute()
-
-        # fmt: off
-        return tuple(chain.from_iterable(map(lambda i: tuple(filter(
-            lambda m: (created_at := format_google_time(m)) > webhook[tuple(webhook.keys())[i[0] + start]]
-            and created_at > webhook["last_date"], i[1]
-        )), enumerate((
-            _(courses.announcements()).get("announcements", []),  # announcements
-            _(courses.courseWorkMaterials()).get("courseWorkMaterial", []),  # materials
-            _(courses.courseWork()).get("courseWork", []),  # assignments
-        )))))
-        # fmt: on
-
-    def make_embeds(posts: Tuple[Post, ...]) -> List[EmbedWithPostData]:  # transform post JSON into dpy embeds
-        pages: List[EmbedWithPostData] = []
-
-        for post in posts:
-            d = post.get("text", "") or post.get("description", "")
-
-            page = Embed(
-                title=f"{cap(post.get('title', '')):256}",
-                description=f"{cap(d):4096}",
-                timestamp=format_google_time(post),
-                url=post["alternateLink"],
-            ).set_footer(text="posted at", icon_url=ICONS["posted"])
-
-            if post.get("workType", None):
-                page.colour = BotColours.purple
-
-            if due_date := get_due_date(post):  # type: ignore
-                page.add_field(name="assignment due", value=f"<t:{due_date.timestamp():.0f}:R>")
-
-            assert page.description
-            char_count = page.character_count()
-            if char_count > 6000:
-                page.description = format(cap(page.description), str(4096 - (char_count - 6000)))
-
-            obj = EmbedWithPostData(page, post)
-            obj.embed.set_author(name="new " + (n := obj.embed_header), icon_url=ICONS[n], url=post["alternateLink"])
-            pages.append(obj)
-
-        return pages
-
-    async def delete_webhook(*, is_deleted: bool = False) -> None:  # delete the current webhook
-        assert client.session
-        await client.db.execute(DEL_QUERY, webhook["user_id"], webhook["course_id"], webhook["channel_id"])
-
-        if not is_deleted:
-            try:
-                wh = Webhook.from_url(webhook["url"], session=client.session, bot_token=client.token)
-                await wh.send(embed=Embed(description="course not found, deleting this webhook..."))
-                await wh.delete(reason=f"associated course could not be found")
-            except discord.HTTPException:
-                pass  # we tried
+def make_embeds(posts: Iterable[Post]) -> List[EmbedWithPostData]:  # transform post JSON into dpy embeds
+    pages: List[EmbedWithPostData] = []
+
+    for post in posts:
+        d = post.get("text", "") or post.get("description", "")
+
+        page = Embed(
+            title=f"{cap(post.get('title', '')):256}",
+            description=f"{cap(d):4096}",
+            timestamp=format_google_time(post),
+            url=post["alternateLink"],
+        ).set_footer(text="posted at", icon_url=ICONS["posted"])
+
+        if post.get("workType", None):
+            page.colour = BotColours.purple
+
+        if due_date := get_due_date(post):  # type: ignore
+            page.add_field(name="assignment due", value=f"<t:{due_date.timestamp():.0f}:R>")
+
+        assert page.description
+        char_count = page.character_count()
+        if char_count > 6000:
+            page.description = format(cap(page.description), str(4096 - (char_count - 6000)))
+
+        obj = EmbedWithPostData(page, post)
+        obj.embed.set_author(name="new " + (n := obj.embed_header), icon_url=ICONS[n], url=post["alternateLink"])
+        pages.append(obj)
+
+    return pages
+
+
+async def delete_webhook(client: PollerHost, webhook: WebhookData, *, is_deleted: bool = False) -> None:
+    assert client.session
+    await client.db.execute(DEL_QUERY, webhook["user_id"], webhook["course_id"], webhook["channel_id"])
+
+    if not is_deleted:
+        try:
+            wh = Webhook.from_url(webhook["url"], session=client.session, bot_token=client.token)
+            await wh.send(embed=Embed(description="course not found, deleting this webhook..."))
+            await wh.delete(reason=f"associated course could not be found")
+        except discord.HTTPException:
+            pass  # we tried
+
+
+class WebhookQueue:
+    """
+    Sends messages through a single webhook one at a time, in the order they were queued.
+
+    Discord's ratelimit headers are kept track of, and the queue waits for the bucket to reset once
+    it's been used up, rather than running into 429s.
+
+    Parameters
+    ----------
+    dispatcher: `WebhookDispatcher`
+        The dispatcher this queue belongs to.
+    url: `str`
+        The webhook's URL.
+    """
+
+    def __init__(self, dispatcher: WebhookDispatcher, url: str) -> None:
+        self.dispatcher = dispatcher
+        self.url = url
+
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+
+        self._queue: asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future[int]]] = asyncio.Queue()
+        self._worker: asyncio.Task[None] | None = None
+
+    @property
+    def idle(self) -> bool:
+        return (self._worker is None or self._worker.done()) and time.monotonic() >= self.reset_at
 
-    async def post_data(pages: List[EmbedWithPostData]) -> None:  # post embeds to the webhook's channel
-        wh: discord.Webhook
-        assert client.session
+    def put(self, payload: Dict[str, Any], /) -> asyncio.Future[int]:
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, future))
 
-        last_posts = {n: datetime.now(tz=timezone.utc) for n in ("announcement", "material", "assignment")}
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
 
-        if not webhook["url"]:
-            channel = client.get_channel(webhook["channel_id"])
-            if not channel:
-                return await delete_webhook(is_deleted=True)
+        return future
+
+    def cancel(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def _run(self) -> None:
+        while not self._queue.empty():
+            payload, future = self._queue.get_nowait()
+            if future.done():
+                continue  # whoever queued this gave up on it
 
-            assert isinstance(channel, discord.TextChannel)
             try:
-                wh = await channel.create_webhook(
-                    name=webhook["course_name"], reason=f"created webhook for course {webhook['course_name']}"
-                )
-            except discord.HTTPException:
-                return await delete_webhook(is_deleted=True)
+                status = await self._execute(payload)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(status)
+
+    async def _wait(self) -> None:
+        now = time.monotonic()
+        delay = self.dispatcher.global_reset_at - now
+        if self.remaining == 0:
+            delay = max(delay, self.reset_at - now)
+
+        if delay > 0:
+            self.dispatcher.time_waited += delay
+            await asyncio.sleep(delay)
+
+    def _update_bucket(self, headers: Any, /) -> None:
+        try:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+            self.reset_at = time.monotonic() + float(headers["X-RateLimit-Reset-After"])
+        except (KeyError, ValueError):
+            pass
+
+    async def _execute(self, payload: Dict[str, Any], /) -> int:
+        session = self.dispatcher.client.session
+        assert session is not None
+
+        for _ in range(DELIVERY_MAX_RETRIES + 1):
+            await self._wait()
+            async with session.post(self.url, json=payload) as resp:
+                self._update_bucket(resp.headers)
+                if resp.status != 429:
+                    self.dispatcher.messages_sent += 1
+                    return resp.status
+
+                self.dispatcher.ratelimited += 1
+                try:
+                    data = await resp.json(content_type=None)
+                except ValueError:
+                    data = {}
+
+                retry_after = float(data.get("retry_after", None) or resp.headers.get("Retry-After", 1))
+                if data.get("global", False) or resp.headers.get("X-RateLimit-Global", None):
+                    self.dispatcher.global_reset_at = time.monotonic() + retry_after
+                else:
+                    self.remaining = 0
+                    self.reset_at = time.monotonic() + retry_after
+
+        return 429
+
+
+class WebhookDispatcher:
+    """
+    Delivers webhook messages, with one `WebhookQueue` per webhook.
+
+    Messages to the same webhook go out in order, while different webhooks are sent to in parallel,
+    each only held back by their own ratelimits (and the global one, if that's ever hit).
+
+    Parameters
+    ----------
+    client: `Amaze | WebhookWorker`
+        The bot instance, or the worker process.
+    """
+
+    def __init__(self, client: PollerHost) -> None:
+        self.client = client
 
-            q = """UPDATE webhooks SET url = $1
-                    WHERE user_id = $2
-                    AND course_id = $3
-                    AND channel_id = $4
-                """
-            await client.db.execute(q, wh.url, webhook["user_id"], webhook["course_id"], webhook["channel_id"])
-        else:
-            wh = Webhook.from_url(webhook["url"], session=client.session)
+        self.global_reset_at = 0.0
 
-        for page in pages:
-            last_posts[page.type] = page.created_at
+        self.messages_sent = 0
+        self.ratelimited = 0
+        self.time_waited = 0.0
+
+        self._queues: Dict[str, WebhookQueue] = {}
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "messages_sent": self.messages_sent,
+            "ratelimited": self.ratelimited,
+            "time_waited": round(self.time_waited, 2),
+            "queues": len(self._queues),
+        }
+
+    async def send(self, url: str, payload: Dict[str, Any], /) -> int:
+        """
+        Sends a message through a webhook once its ratelimit allows it, and returns the response's status code.
+        """
 
-            await asyncio.sleep(1)
-            view = View()
-            view.add_item(Button(label="view in classroom", style=discord.ButtonStyle.link, url=page.url))
-            view.weights.weights[0] = 5
+        if (queue := self._queues.get(url, None)) is None:
+            queue = self._queues[url] = WebhookQueue(self, url)
+
+        return await queue.put(payload)
+
+    def prune(self) -> None:
+        """
+        Drops the queues that have nothing to send, and whose ratelimits have already reset.
+        """
+
+        for url in tuple(url for url, queue in self._queues.items() if queue.idle):
+            del self._queues[url]
+
+    def close(self) -> None:
+        for queue in self._queues.values():
+            queue.cancel()
+
+        self._queues.clear()
+
+
+def group_pages(pages: List[EmbedWithPostData]) -> List[List[EmbedWithPostData]]:
+    """
+    Packs pages, in order, into as few messages as Discord's limits allow.
+    """
+
+    groups: List[List[EmbedWithPostData]] = []
+    chars = buttons = 0
+
+    for page in pages:
+        page_chars = page.embed.character_count()
+        page_buttons = 1 + len(page.materials)
+
+        if (
+            not groups
+            or len(groups[-1]) >= MESSAGE_MAX_EMBEDS
+            or chars + page_chars > MESSAGE_MAX_CHARS
+            or buttons + page_buttons > MESSAGE_MAX_BUTTONS
+        ):
+            groups.append([])
+            chars = buttons = 0
+
+        groups[-1].append(page)
+        chars += page_chars
+        buttons += page_buttons
+
+    return groups
+
+
+def make_message(webhook: WebhookData, group: List[EmbedWithPostData]) -> Dict[str, Any]:
+    view = View()
+    if len(group) == 1:
+        page = group[0]
+        view.add_item(Button(label="view in classroom", style=discord.ButtonStyle.link, url=page.url))
+        view.weights.weights[0] = 5
+        AttachmentsView.add_attachments(page.materials, view)
+    else:
+        # with more than one post in the message, the buttons need to say which post they're for
+        for page in group:
+            label = f"{cap(page.embed.title or 'view in classroom'):80}"
+            view.add_item(Button(label=label, style=discord.ButtonStyle.link, url=page.url))
+        for page in group:
             AttachmentsView.add_attachments(page.materials, view)
 
-            async with client.session.post(
-                url=f"https://discord.com/api/v{INTERNAL_API_VERSION}/webhooks/{wh.id}/{wh.token}",
-                json={
-                    "username": webhook["course_name"],
-                    "embeds": [page.embed.to_dict()],
-                    "components": view.to_components(),
-                },
-            ) as resp:
-                if resp.status in (401, 403, 404):
-                    await delete_webhook()
-
-        q = """UPDATE webhooks SET
-                    last_date = $4,
-                    last_announcement_post = $5,
-                    last_material_post = $6,
-                    last_assignment_post = $7
-                WHERE user_id = $1
-                AND course_id = $2
-                AND channel_id = $3
+    return {
+        "username": webhook["course_name"],
+        "embeds": [page.embed.to_dict() for page in group],
+        "components": view.to_components(),
+    }
+
+
+async def post_data(
+    client: PollerHost, dispatcher: WebhookDispatcher, webhook: WebhookData, pages: List[EmbedWithPostData]
+) -> None:
+    """
+    Posts embeds to the webhook's channel, then moves the webhook's watermarks up to the newest post sent of each kind.
+    """
+
+    wh: discord.Webhook
+    assert client.session
+
+    last_posts: Dict[str, datetime | None] = {n: None for n in POST_KINDS}
+
+    if not webhook["url"]:
+        # straight through the API rather than the channel object, since workers don't have a gateway connection
+        async with client.session.post(
+            f"https://discord.com/api/v{INTERNAL_API_VERSION}/channels/{webhook['channel_id']}/webhooks",
+            json={"name": f"{cap(webhook['course_name']):80}"},
+            headers={"Authorization": f"Bot {client.token}"},
+        ) as resp:
+            if resp.status >= 400:
+                return await delete_webhook(client, webhook, is_deleted=True)
+
+            data = await resp.json()
+
+        wh = Webhook.partial(int(data["id"]), data["token"], session=client.session)
+        q = """UPDATE webhooks SET url = $1
+                WHERE user_id = $2
+                AND course_id = $3
+                AND channel_id = $4
             """
-        await client.db.execute(
-            q,
-            webhook["user_id"],
-            webhook["course_id"],
-            webhook["channel_id"],
-            datetime.now(tz=timezone.utc),
-            *last_posts.values(),
-        )
+        await client.db.execute(q, wh.url, webhook["user_id"], webhook["course_id"], webhook["channel_id"])
+    else:
+        wh = Webhook.from_url(webhook["url"], session=client.session)
+
+    url = f"https://discord.com/api/v{INTERNAL_API_VERSION}/webhooks/{wh.id}/{wh.token}"
+    for group in group_pages(pages):
+        try:
+            status = await dispatcher.send(url, make_message(webhook, group))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            break
 
-    resource_cache: CappedDict[int, Resource] = CappedDict(50)
-    post_cache: CappedDict[int, Tuple[Post, ...]] = CappedDict(100)
-    webhooks: List[WebhookData] = await client.db.fetch("SELECT * FROM webhooks")
+        if status in (401, 403, 404):
+            return await delete_webhook(client, webhook)
+        if status >= 400:
+            break  # try the rest again next cycle
 
-    client.logger.info(
-        "%srunning loop for %s%s%s webhook(s)",
-        PrintColours.BLUE,
-        PrintColours.GREEN,
-        format(len(webhooks), ","),
-        PrintColours.BLUE,
+        for page in group:
+            last_posts[page.type] = page.created_at
+
+    # the watermarks are the updateTime cursors the next poll picks up from, so they only ever move forward
+    q = """UPDATE webhooks SET
+                last_announcement_post = GREATEST(last_announcement_post, $4),
+                last_material_post = GREATEST(last_material_post, $5),
+                last_assignment_post = GREATEST(last_assignment_post, $6)
+            WHERE user_id = $1
+            AND course_id = $2
+            AND channel_id = $3
+        """
+    await client.db.execute(
+        q,
+        webhook["user_id"],
+        webhook["course_id"],
+        webhook["channel_id"],
+        *last_posts.values(),
     )
 
-    for webhook in webhooks:
-        await asyncio.sleep(0.1)
 
-        if not (service := resource_cache.get(webhook["user_id"], None)):
-            q = """SELECT credentials FROM authorized
-                    WHERE user_id = $1
-                """
-            creds = Credentials.from_authorized_user_info(await client.db.fetchval(q, webhook["user_id"]))
-            service: Resource = build("classroom", "v1", credentials=creds)
-            resource_cache[webhook["user_id"]] = service
+class WebhookPoller:
+    """
+    Checks every webhooked course for new posts, and sends them off to the channels watching it.
 
-        try:
-            if (new_posts := post_cache.get(webhook["course_id"], None)) is None:
-                if not (new_posts := await asyncio.to_thread(run_google)):
-                    post_cache[webhook["course_id"]] = tuple()
-                    continue
-
-                new_posts = tuple(sorted(new_posts, key=lambda i: format_google_time(i).timestamp()))
-                post_cache[webhook["course_id"]] = new_posts
-            elif not new_posts:
+    Webhooks are grouped by course, so each course is only fetched once per cycle (using the credentials of
+    whichever subscriber's still work) and its posts are only rendered once, no matter how many channels
+    are watching it. Each channel then gets the posts newer than its own watermarks.
+
+    Courses are handed out to a fixed pool of workers, so a cycle takes about as long as the slowest
+    few courses rather than the sum of all of them. Concurrency is also capped per google account.
+
+    Parameters
+    ----------
+    client: `Amaze | WebhookWorker`
+        The bot instance, or the worker process.
+    workers: `int`
+        The most courses that are polled at once.
+    per_user: `int`
+        The most courses that are polled at once using the same user's credentials.
+    """
+
+    def __init__(self, client: PollerHost, *, workers: int = POLL_WORKERS, per_user: int = POLL_PER_USER) -> None:
+        self.client = client
+        self.workers = workers
+        self.per_user = per_user
+
+        self.dispatcher = WebhookDispatcher(client)
+
+        self.last_cycle: Dict[str, Any] = {}
+
+        # all of these only live for the duration of a cycle
+        self._user_slots: Dict[int, asyncio.Semaphore] = {}
+        self._classrooms: Dict[ClassroomClient, int] = {}  # batches each client had sent before this cycle
+        self._revoked: Dict[int, Tuple[str, List[WebhookData]]] = {}  # user -> (refresh token that failed, webhooks)
+
+    async def _get_classroom(self, user_id: int, /) -> ClassroomClient:
+        classroom = await self.client.get_classroom(user_id)
+        self._classrooms.setdefault(classroom, classroom.batcher.batches_sent)
+
+        return classroom
+
+    @staticmethod
+    async def _sync_stream(classroom: ClassroomClient, course_id: int, kind: str, since: datetime, /) -> List[Post]:
+        # streams are listed newest update first, so we can stop reading as soon as we hit one we've already seen
+        path, key = POST_STREAMS[kind]
+        new_posts: List[Post] = []
+
+        pages = classroom.pages(
+            f"courses/{course_id}/{path}", key, batch=True, pageSize=POLL_PAGE_SIZE, orderBy="updateTime desc"
+        )
+        async with aclosing(pages):
+            n_pages = 0
+            async for page in pages:
+                for post in page:
+                    if format_google_time(post) <= since:
+                        return new_posts
+
+                    new_posts.append(post)
+
+                if (n_pages := n_pages + 1) >= POLL_MAX_PAGES:
+                    break
+
+        return new_posts
+
+    @classmethod
+    async def _fetch_course(
+        cls, classroom: ClassroomClient, course_id: int, since: Dict[str, datetime], /
+    ) -> Dict[str, List[Post]]:
+        # the first page of all three streams (and those of any other courses polled with the same credentials
+        # at the same time) go out in a single batch request, usually that's all there is to read
+        streams = await asyncio.gather(*(cls._sync_stream(classroom, course_id, k, since[k]) for k in POST_KINDS))
+        return dict(zip(POST_KINDS, streams))
+
+    async def _fetch_for_subscribers(
+        self, course_id: int, webhooks: List[WebhookData], since: Dict[str, datetime], /
+    ) -> Tuple[Dict[str, List[Post]], List[WebhookData]] | None:
+        """
+        Fetches the course's posts updated after `since`, trying each subscriber's credentials until one of them works.
+        Returns the posts along with the webhooks that are still around, or `None` if nobody's credentials worked.
+        """
+
+        by_user: Dict[int, List[WebhookData]] = {}
+        for webhook in webhooks:
+            by_user.setdefault(webhook["user_id"], []).append(webhook)
+
+        posts: Dict[str, List[Post]] | None = None
+        for user_id, user_webhooks in tuple(by_user.items()):
+            if user_id in self._revoked:
+                del by_user[user_id]
+                self._revoked[user_id][1].extend(user_webhooks)
                 continue
 
-            await post_data(make_embeds(new_posts))
+            classroom = None
+            try:
+                async with self._user_slots.setdefault(user_id, asyncio.Semaphore(self.per_user)):
+                    classroom = await self._get_classroom(user_id)
+                    posts = await self._fetch_course(classroom, course_id, since)
+            except RefreshError:
+                # purged along with everyone else's at the end of the cycle, unless they've logged in again by then.
+                # their webhooks are only deleted if they do get purged
+                assert classroom is not None
+                del by_user[user_id]
+                revoked = self._revoked.setdefault(user_id, (classroom.credentials.refresh_token or "", []))
+                revoked[1].extend(user_webhooks)
+                continue
+            except HttpError as e:
+                if e.status_code not in (401, 403, 404):
+                    raise
+            else:
+                break
+
+            # they can't see the course anymore
+            del by_user[user_id]
+            await asyncio.gather(*(delete_webhook(self.client, w) for w in user_webhooks))
+
+        if posts is None:
+            return None
+
+        return posts, [w for user_webhooks in by_user.values() for w in user_webhooks]
+
+    @staticmethod
+    def _watermark(webhook: WebhookData, kind: str, /) -> datetime:
+        # last_date keeps anything from before the webhook was set up from being posted
+        return max(webhook[f"last_{kind}_post"], webhook["last_date"])  # type: ignore
+
+    async def _poll_course(self, course_id: int, webhooks: List[WebhookData], /) -> int:
+        # anything older than every subscriber's watermark can't be new to anybody
+        since = {kind: min(self._watermark(w, kind) for w in webhooks) for kind in POST_KINDS}
+        if (fetched := await self._fetch_for_subscribers(course_id, webhooks, since)) is None:
+            return 0
+
+        posts, webhooks = fetched
+        if not (new_posts := list(chain.from_iterable(posts.values()))):
+            return 0
+
+        # rendered once, then each channel gets whichever of these it hasn't seen
+        pages = make_embeds(sorted(new_posts, key=lambda p: format_google_time(p)))
+        deliveries = []
+        for webhook in webhooks:
+            if unseen := [p for p in pages if p.created_at > self._watermark(webhook, p.type)]:
+                deliveries.append(post_data(self.client, self.dispatcher, webhook, unseen))
+
+        await asyncio.gather(*deliveries)
+        return len(pages)
+
+    async def _refresh_course_lists(self, user_ids: List[int], /) -> None:
+        # keeps /courses from having to wait on google for anybody with webhooks set up
+        async def refresh(user_id: int) -> None:
+            try:
+                await self.client.course_cache.refresh_if_stale(user_id, await self.client.get_classroom(user_id))
+            except RuntimeError:
+                pass  # logged out partway through the cycle
+
+        await asyncio.gather(*(refresh(u) for u in user_ids))
+
+    async def _shard_lag(self, shards: Collection[int], /) -> float:
+        """
+        Records that these shards are being polled now, and returns how far behind schedule the most overdue one was.
+
+        Shards are polled by whichever process holds them at the time, in separate calls,
+        so this is tracked per shard in redis rather than between calls.
+        """
 
-        except RefreshError:
-            await delete_webhook()
-            await client.remove_access(webhook["user_id"])
-        except HttpError as e:
-            if e.status_code in (401, 403, 404):
-                await delete_webhook()
+        shards = list(shards)
+        now = time.time()
+        previous = await self.client.redis.hmget(POLL_LAST_STARTED, [str(s) for s in shards])
+        await self.client.redis.hset(POLL_LAST_STARTED, mapping={str(s): now for s in shards})  # type: ignore
+
+        # a shard that's never been polled before has nothing to be late against
+        gaps = [now - float(last) for last in previous if last is not None]
+        return max((max(0.0, gap - POLL_INTERVAL * 60) for gap in gaps), default=0.0)
+
+    async def run_cycle(self, shards: Collection[int] | None = None) -> None:
+        """
+        Polls every webhooked course, or only the ones in these shards.
+        """
+
+        started = time.monotonic()
+        lag = await self._shard_lag(range(POLL_SHARDS) if shards is None else shards)
+
+        if shards is None:
+            webhooks: List[WebhookData] = await self.client.db.fetch("SELECT * FROM webhooks")
+        else:
+            q = """SELECT * FROM webhooks
+                    WHERE mod(course_id, $1) = ANY($2::int[])
+                """
+            webhooks = await self.client.db.fetch(q, POLL_SHARDS, list(shards))
+        courses: Dict[int, List[WebhookData]] = {}
+        for webhook in webhooks:
+            courses.setdefault(webhook["course_id"], []).append(webhook)
+
+        self.client.logger.info(
+            "%srunning loop for %s%s%s webhook(s) across %s%s%s course(s)",
+            PrintColours.BLUE,
+            PrintColours.GREEN,
+            format(len(webhooks), ","),
+            PrintColours.BLUE,
+            PrintColours.GREEN,
+            format(len(courses), ","),
+            PrintColours.BLUE,
+        )
+
+        queue: asyncio.Queue[Tuple[int, List[WebhookData]]] = asyncio.Queue()
+        for item in courses.items():
+            queue.put_nowait(item)
+
+        posted = errors = 0
+
+        async def worker() -> None:
+            nonlocal posted, errors
+
+            while not queue.empty():
+                course_id, subscribers = queue.get_nowait()
+                try:
+                    posted += await self._poll_course(course_id, subscribers)
+                except Exception as e:
+                    errors += 1
+                    self.client.logger.error("error polling course %d: %s", course_id, e)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(courses)))))
+            await self._refresh_course_lists([u for u in self._user_slots if u not in self._revoked])
+        finally:
+            batches = sum(c.batcher.batches_sent - sent for c, sent in self._classrooms.items())
+            if self._revoked:
+                try:
+                    failed_tokens = {user_id: token for user_id, (token, _) in self._revoked.items()}
+                    purged = await self.client.purge_users(self._revoked, failed_tokens=failed_tokens)
+                    await asyncio.gather(
+                        *(delete_webhook(self.client, w) for user_id in purged for w in self._revoked[user_id][1])
+                    )
+                except Exception as e:
+                    self.client.logger.error("error purging %d revoked user(s): %s", len(self._revoked), e)
+
+            self._user_slots.clear()
+            self._classrooms.clear()
+            self._revoked.clear()
+            self.dispatcher.prune()
+
+        duration = time.monotonic() - started
+        self.last_cycle = {
+            "finished": datetime.now(tz=timezone.utc),
+            "webhooks": len(webhooks),
+            "courses": len(courses),
+            "posts": posted,
+            "google_batches": batches,
+            **self.dispatcher.stats,
+            "errors": errors,
+            "duration": round(duration, 2),
+            "lag": round(lag, 2),
+        }
+
+        colour = PrintColours.RED if duration > POLL_INTERVAL * 60 else PrintColours.BLUE
+        self.client.logger.info(
+            "%swebhook cycle took %.1fs (lag %.1fs), %d new post(s), %d error(s)", colour, duration, lag, posted, errors
+        )
 
 
 class WebhookPicker(Select):
@@ -346,10 +785,12 @@ class WebhookPages(BasePages, auto_defer=False):
             )
             self._webhooks.append(bundle := webhooks[: self.WEBHOOKS_PER_PAGE])
             for webhook in bundle:
+                # the guild might be on a shard that another cluster's running, so not in our cache
+                guild = self.client.get_guild(webhook["guild_id"])
                 page.add_field(
                     name=f"{cap(webhook['course_name']):256}",
                     value=f"— created in <#{webhook['channel_id']}>\n"
-                    f"— in guild `{self.client.get_guild(webhook['guild_id']).name}`",
+                    f"— in guild `{guild.name if guild else webhook['guild_id']}`",
                 )
             self._pages.append(page)
             webhooks = webhooks[self.WEBHOOKS_PER_PAGE :]
@@ -382,16 +823,50 @@ class WebhookPages(BasePages, auto_defer=False):
 class Webhooks(commands.Cog):
     def __init__(self, client: Amaze) -> None:
         self.client = client
+        self.poller = WebhookPoller(client)
+        self.leases = ShardLeases(client.redis, POLL_LEASES, POLL_SHARDS)
         if sys.platform == "win32":
             return
 
-        fetch_posts.before_loop(client.wait_until_ready)
-        self.running_task = fetch_posts.start(client)
+        self.poll_task = tasks.loop(minutes=POLL_INTERVAL)(self.poll_if_no_workers)
+        self.poll_task.before_loop(client.wait_until_ready)
+        self.poll_task.start()
+
+    @property
+    def cluster_poll_shards(self) -> List[int]:
+        """
+        List[:class:`int`] The poll shards this cluster covers for, spread between clusters by their discord shards
+        """
+
+        shard_count = self.client.shard_count or 1
+        shard_ids = self.client.shard_ids if self.client.shard_ids is not None else range(shard_count)
+        return [s for s in range(POLL_SHARDS) if s % shard_count in shard_ids]
+
+    async def poll_if_no_workers(self) -> None:
+        # polling's normally done by webhook_worker.py processes, the bot only covers for them if there are none
+        if await self.leases.live_workers():
+            return
+
+        if shards := await self.leases.claim_window(self.cluster_poll_shards, POLL_INTERVAL * 60):
+            await self.poller.run_cycle(shards)
 
     if sys.platform != "win32":
 
         async def cog_unload(self) -> None:
-            self.running_task.cancel()
+            self.poll_task.cancel()
+            self.poller.dispatcher.close()
+
+    @commands.command(name="pollstats", hidden=True)
+    @commands.is_owner()
+    async def poll_stats(self, ctx: commands.Context):
+        cycles = {"bot": self.poller.last_cycle, **await self.leases.statuses()}
+        if not (cycles := {k: v for k, v in cycles.items() if v}):
+            return await ctx.reply("no cycles have finished yet")
+
+        text = "\n\n".join(
+            f"# {worker}\n" + "\n".join(f"{k}: {v}" for k, v in stats.items()) for worker, stats in cycles.items()
+        )
+        await ctx.reply(f"```yml\n{text}\n```")
 
     @command(name="webhooks")
     @is_logged_in()
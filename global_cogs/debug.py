@@ -241,6 +241,21 @@ class Jishaku(*OPTIONAL_FEATURES, *STANDARD_FEATURES):
         summary.append("")  # blank line
         summary.append(f"Average websocket latency: `{round(self.bot.latency * 1000, 2)}ms`")
 
+        # the transit cog's API client, if it's loaded on this bot
+        if (transit_api := getattr(self.bot.get_cog("Transit"), "api", None)) is not None:
+            stats = transit_api.stats
+            summary.append(
+                f"OC Transpo API: `{stats['p50_ms']}ms` p50, `{stats['p95_ms']}ms` p95, "
+                f"`{stats['recent_error_rate']:.1%}` recent error rate, breaker is *{stats['breaker']}*"
+            )
+
+        # the gclass bot's per-user classroom clients
+        if (classrooms := getattr(self.bot, "classrooms", None)) is not None:
+            stats = classrooms.stats
+            summary.append(
+                f"Classroom clients: `{stats['stored']}` cached, `{stats['hits']}` hits, `{stats['misses']}` misses"
+            )
+
         await ctx.send("\n".join(summary))
 
     @Feature.Command(
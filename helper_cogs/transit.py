@@ -2,33 +2,58 @@ from __future__ import annotations
 
 import asyncio
 import csv
+import heapq
 import io
 import logging
+import math
+import os
+import pathlib
 import random
 import re
+import shutil
+import tempfile
 import time
-from datetime import datetime, timedelta
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
 from enum import Enum
 from functools import partial
+from operator import itemgetter
 from PIL import Image, ImageFont, ImageDraw
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, Iterable, List, Literal, Tuple, TypeVar
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, Iterable, List, Literal, Mapping, Set, Tuple, TypeVar
 from zipfile import ZipFile
+from zoneinfo import ZoneInfo
 
+import aiohttp
+import numpy as np
 import orjson
 
 import discord
 from discord import ui
-from discord.app_commands import Choice, command, describe, autocomplete
+from discord.app_commands import Choice, Range, command, describe, autocomplete
 from discord.ext import commands, tasks
 from discord.utils import cached_property
 
-from utils import CHOICES, AsyncInit, BotEmojis, PrintColours, View, cap
+from utils import (
+    CHOICES,
+    AsyncInit,
+    BotEmojis,
+    CircuitBreaker,
+    CircuitOpen,
+    CoalescingCache,
+    LatencyTracker,
+    PrintColours,
+    TokenBucket,
+    View,
+    cap,
+)
 
 if TYPE_CHECKING:
     from discord import Embed, File, InteractionMessage, Member, SelectOption, User
 
     from helper_bot import NotGDKID
-    from utils import BusStopResponse, NGKContext, PostgresPool, RouteData, StopInfo, TripData
+    from utils import BusStopResponse, NGKContext, RouteData, StopInfo, TripData
 
     T = TypeVar("T")
     Interaction = discord.Interaction[NotGDKID]
@@ -37,8 +62,6 @@ if TYPE_CHECKING:
     EditFunc = Callable[..., Coroutine[Any, Any, InteractionMessage]]
     RouteCollection = List[Tuple[str, str, List[TripData]]]
 
-    route_colour_cache: Dict[str, Tuple[str, str]]
-
 log = logging.getLogger(f"NotGDKID:{__name__}")
 
 RAIL = ("1",)
@@ -47,7 +70,29 @@ LRT_STATION_HINTS = (
     "PARLIAMENT",
 )
 
+# can be pointed at a local stand-in (see benchmarks/octranspo_standin.py) so we're not hammering the real thing
+OCTRANSPO_API = os.environ.get("OCTRANSPO_API", "https://api.octranspo1.com/v2.0")
+
+OCTRANSPO_RATE = 5  # requests per second, keeps us comfortably under the per-key quota even with live boards running
+OCTRANSPO_BURST = 10
+OCTRANSPO_TIMEOUT = 8  # seconds, for the whole request (including waiting on the rate limiter)
+OCTRANSPO_CONNECTIONS = 8  # separate pool from the bot's session, so a slow API can't starve everything else
+OCTRANSPO_BREAKER_THRESHOLD = 5  # consecutive failures before we stop trying for a bit
+OCTRANSPO_BREAKER_RESET = 30  # seconds
+
+TRIP_CACHE_TTL = 20  # seconds, OC Transpo only updates their GPS adjustments every so often anyway
+
+LIVE_MIN_INTERVAL = 30  # seconds between polls for a stop with only a few live boards on it
+LIVE_MAX_INTERVAL = 90  # has to stay well under BusDisplay.TIMEOUT, or a board can time out between two polls
+LIVE_EDIT_SPACING = 2  # seconds of interval added per subscribed message, to stay well clear of edit rate limits
+LIVE_MAX_DURATION = 600  # interaction tokens die after 15 minutes, after which we can't edit the message anymore
+
+STATION_PREFIX = "S"  # station boards are keyed by this + the station's lowest stop code, eg: S3000
+STATION_FETCH_CONCURRENCY = 4
+STATION_FETCH_TIMEOUT = 10  # seconds
+
 RELOAD_FAIL = "i couldn't reload that page, it's most likely that there were no trips left, therefore i've reset the menu to the landing page"
+SCHEDULED_NOTE = " • live data unavailable, showing scheduled times"
 PLACEHOLDER_URL = "https://i.vgy.me/x66JRh.png"
 
 STN_PATTERN = re.compile(
@@ -75,11 +120,25 @@ STN_PATTERN = re.compile(
     flags=re.ASCII | re.VERBOSE,
 )
 
+TRIGRAM_WORD_PATTERN = re.compile(r"[^\W_]+")
+COORDINATES_PATTERN = re.compile(r"^\s*(?P<lat>-?\d{1,2}(?:\.\d+)?)\s*,\s*(?P<lon>-?\d{1,3}(?:\.\d+)?)\s*$")
+
+EARTH_RADIUS = 6_371_000  # metres
+GRID_CELL_SIZE = 250  # metres, a couple of blocks
+GRID_MAX_RINGS = 40  # ~10km, anything further than that isn't "nearby" anyway
+
 TITLECASE_PATTERN = re.compile(
     r"^(?P<start>\w)|(?:\s|-)d'(?P<d_apostrophe>\w)|\s(?P<normal_space>\w)|-(?P<dash>[^d'])|(?P<abbrev>(?:\w\.)+\w)",
     flags=re.ASCII,
 )
 
+TRANSIT_TZ = ZoneInfo("America/Toronto")  # gtfs times are in the agency's local time
+
+SCHEDULE_DIR = pathlib.Path("cache/schedule")
+SCHEDULE_WINDOW = 3 * 3600  # seconds ahead to look for scheduled departures
+SCHEDULE_TRIPS_PER_ROUTE = 3  # same as the live API
+SCHEDULE_TIME_BITS = 20  # departure times are packed into the low bits of the sort key (gtfs times can go past 24:00)
+
 GTFS_BUILD_INCLUDE = {
     "routes": ("route_short_name", "route_color", "route_text_color"),
     "stops": ("stop_code", "stop_name", "stop_lat", "stop_lon"),
@@ -93,10 +152,6 @@ no_such_stop: Callable[[str], Embed] = lambda stop_code: discord.Embed(
     description=f"stop **#{stop_code}** does not exist", timestamp=datetime.now()
 )
 
-stop_search_query: Callable[[int], str] = lambda limit: (
-    f"SELECT stop_code, stop_name FROM stops ORDER BY SIMILARITY(LOWER(stop_name), LOWER($1)) DESC LIMIT {limit}"
-)
-
 
 def _slice(obj: List[T], /, *, size: int = 25) -> Tuple[List[T], ...]:
     return tuple(obj[i : i + size] for i in range(0, len(obj), size))
@@ -130,11 +185,15 @@ def _parse_trips(o: TripField) -> List[TripData]:
     return _parse_trips(o["Trip"])
 
 
-def _sort_destinations(trips: List[TripData], /) -> List[str]:
-    return sorted(
-        {t["TripDestination"] for t in trips},
-        key=lambda x: x[0],
-    )
+def _index_destinations(trips: List[TripData], /) -> Dict[str, List[TripData]]:
+    index: Dict[str, List[TripData]] = {}
+    for trip in trips:
+        index.setdefault(trip["TripDestination"], []).append(trip)
+
+    return {
+        dest: sorted(index[dest], key=lambda x: int(x["AdjustedScheduleTime"]))
+        for dest in sorted(index, key=lambda x: x[0])
+    }
 
 
 def _sort_routes(routes: List[RouteData], /) -> RouteCollection:
@@ -144,16 +203,503 @@ def _sort_routes(routes: List[RouteData], /) -> RouteCollection:
     )
 
 
+def _stop_label(stop: StopInfo, /) -> str:
+    if stop["stop_code"].startswith(STATION_PREFIX):
+        return f"★  {stop['stop_name']} (all platforms)"
+    if stop["stop_name"].endswith(" Stn."):
+        return f"★  [{stop['stop_code']}] {stop['stop_name']}"
+
+    return f"[{stop['stop_code']}] {stop['stop_name']}"
+
+
+def _merge_station_responses(key: str, name: str, responses: List[BusStopResponse], /) -> BusStopResponse:
+    # routes that stop at more than one platform (rare, but it happens) get their trips combined
+    merged: Dict[Tuple[str, str], RouteData] = {}
+    for response in responses:
+        assert response["Routes"]["Route"] is not None
+        _, routes = _get_trips_and_routes(response["Routes"]["Route"])
+        for route in routes:
+            if (existing := merged.get((route["RouteNo"], route["RouteHeading"]), None)) is None:
+                merged[(route["RouteNo"], route["RouteHeading"])] = {**route, "Trips": _parse_trips(route["Trips"])}
+                continue
+
+            trips = [*_parse_trips(existing["Trips"]), *_parse_trips(route["Trips"])]
+            existing["Trips"] = sorted(trips, key=lambda x: int(x["AdjustedScheduleTime"]))
+
+    return {
+        "StopNo": key,
+        "Error": "",
+        "StopDescription": name,
+        "Routes": {"Route": list(merged.values())},
+        "Scheduled": any(r.get("Scheduled", False) for r in responses),
+    }
+
+
+def _trigrams(s: str, /) -> Set[str]:
+    # same trigram extraction that pg_trgm does, so results are ranked the same as they were with SIMILARITY()
+    grams = set()
+    for word in TRIGRAM_WORD_PATTERN.findall(s.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+class StopTable:
+    """
+    Read-only, in-memory copy of the `stops` table.
+
+    The table only ever changes when the GTFS data is rebuilt, so rather than updating this in place,
+    a new one is built and swapped in.
+
+    Parameters
+    ----------
+    records: `Iterable[StopInfo]`
+        The rows of the `stops` table.
+    """
+
+    __slots__ = (
+        "_rows",
+        "_stop_count",
+        "_stations",
+        "_by_code",
+        "_gram_counts",
+        "_gram_index",
+        "_x_scale",
+        "_points",
+        "_cells",
+    )
+
+    def __init__(self, records: Iterable[StopInfo], /) -> None:
+        rows: List[StopInfo] = [dict(r) for r in records]  # type: ignore
+        self._stop_count = len(rows)
+
+        # transitway stations have a separate stop code for each side/platform, but they all share the same name
+        # so each of those also gets a station-wide entry, which is searchable and can be looked up like any other stop
+        platforms: Dict[str, List[StopInfo]] = {}
+        for row in rows:
+            if row["stop_name"].endswith(" Stn."):
+                platforms.setdefault(row["stop_name"], []).append(row)
+
+        self._stations: Dict[str, Tuple[str, ...]] = {}
+        for name, members in platforms.items():
+            codes = tuple(sorted({m["stop_code"] for m in members}))
+            if len(codes) > 1:
+                key = STATION_PREFIX + codes[0]
+                self._stations[key] = codes
+                rows.append({**members[0], "stop_code": key, "stop_name": name})
+
+        self._rows: Tuple[StopInfo, ...] = tuple(rows)
+        self._by_code: Dict[str, StopInfo] = {r["stop_code"]: r for r in self._rows}
+        self._gram_counts: List[int] = []
+        self._gram_index: Dict[str, List[int]] = {}
+
+        for idx, row in enumerate(self._rows):
+            grams = _trigrams(row["stop_name"])
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._gram_index.setdefault(gram, []).append(idx)
+
+        self._build_grid()
+
+    def _build_grid(self) -> None:
+        # stops are projected onto a flat plane (equirectangular, which is plenty accurate at city scale)
+        # and bucketed into square cells, so a nearest-stop lookup only has to look at a few cells around the point
+        coords: Dict[int, Tuple[float, float]] = {}
+        for idx, row in enumerate(self._rows[: self._stop_count]):  # station entries would just be duplicates
+            try:
+                coords[idx] = (float(row["stop_lat"]), float(row["stop_lon"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        mean_lat = sum(lat for lat, _ in coords.values()) / len(coords) if coords else 0.0
+        self._x_scale = math.cos(math.radians(mean_lat))
+        self._points: Dict[int, Tuple[float, float]] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+        for idx, (lat, lon) in coords.items():
+            x, y = point = self._project(lat, lon)
+            self._points[idx] = point
+            self._cells.setdefault((int(x // GRID_CELL_SIZE), int(y // GRID_CELL_SIZE)), []).append(idx)
+
+    def _project(self, lat: float, lon: float, /) -> Tuple[float, float]:
+        return EARTH_RADIUS * math.radians(lon) * self._x_scale, EARTH_RADIUS * math.radians(lat)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, stop_code: str) -> bool:
+        return stop_code in self._by_code
+
+    def get(self, stop_code: str, /) -> StopInfo | None:
+        return self._by_code.get(stop_code, None)
+
+    def station_codes(self, key: str, /) -> Tuple[str, ...] | None:
+        """
+        Returns the stop codes of every platform at a station, if the key is a station key.
+        """
+
+        return self._stations.get(key, None)
+
+    def search(self, query: str, /, *, limit: int) -> List[StopInfo]:
+        """
+        Returns up to `limit` stops, ordered by the trigram similarity of their name to `query`.
+        """
+
+        query_grams = _trigrams(query)
+        if not query_grams:
+            return list(self._rows[:limit])
+
+        shared: Counter[int] = Counter()
+        for gram in query_grams:
+            shared.update(self._gram_index.get(gram, ()))
+
+        q_count = len(query_grams)
+        similarity: Callable[[Tuple[int, int]], Tuple[float, bool]] = lambda x: (
+            x[1] / (q_count + self._gram_counts[x[0]] - x[1]),
+            x[0] >= self._stop_count,  # station-wide entries come before their platforms when they're tied
+        )
+
+        return [self._rows[idx] for idx, _ in heapq.nlargest(limit, shared.items(), key=similarity)]
+
+    def nearest(self, lat: float, lon: float, /, *, limit: int) -> List[Tuple[StopInfo, float]]:
+        """
+        Returns up to `limit` of the stops closest to the given point, along with their distance to it in metres.
+        """
+
+        if not self._points:
+            return []
+
+        x, y = self._project(lat, lon)
+        cx, cy = int(x // GRID_CELL_SIZE), int(y // GRID_CELL_SIZE)
+        found: List[Tuple[float, int]] = []
+        seen = 0
+
+        # walk outwards one ring of cells at a time, and stop once every cell we haven't looked at yet
+        # is further away than the furthest stop we'd be returning
+        ring = 0
+        while seen < len(self._points) and ring <= GRID_MAX_RINGS:
+            if ring == 0:
+                cells = ((cx, cy),)
+            else:
+                cells = (
+                    *((cx + dx, cy + dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)),
+                    *((cx + dx, cy + dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)),
+                )
+
+            for cell in cells:
+                for idx in self._cells.get(cell, ()):
+                    px, py = self._points[idx]
+                    found.append((math.hypot(px - x, py - y), idx))
+                    seen += 1
+
+            if len(found) >= limit and heapq.nsmallest(limit, found)[-1][0] <= ring * GRID_CELL_SIZE:
+                break
+
+            ring += 1
+
+        return [(self._rows[idx], distance) for distance, idx in heapq.nsmallest(limit, found)]
+
+
+def _gtfs_seconds(t: str, /) -> int:
+    h, m, s = t.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def _read_gtfs_table(zipfile: ZipFile, table: str, /, *columns: str) -> Iterable[Tuple[str, ...]]:
+    reader = csv.reader(io.TextIOWrapper(zipfile.open(table + ".txt"), encoding="utf-8-sig"))
+    colnames = next(reader)
+    colindexes = tuple(colnames.index(c) for c in columns)
+
+    for row in reader:
+        yield tuple(row[i] for i in colindexes)
+
+
+def _read_gtfs_columns(zipfile: ZipFile, table: str, /, *columns: str) -> Tuple[np.ndarray, ...]:
+    # same deal as above but the whole table comes back as one array per column,
+    # without a python level loop over the rows (which there can be millions of)
+    assert len(columns) > 1, "itemgetter only gives back tuples for more than one column"
+
+    reader = csv.reader(io.TextIOWrapper(zipfile.open(table + ".txt"), encoding="utf-8-sig"))
+    colnames = next(reader)
+    rows = map(itemgetter(*(colnames.index(c) for c in columns)), reader)
+
+    return tuple(np.array(column, dtype=np.str_) for column in zip(*rows)) or tuple(
+        np.array([], dtype=np.str_) for _ in columns
+    )
+
+
+def _lookup(keys: np.ndarray, values: np.ndarray, wanted: np.ndarray, /) -> np.ndarray:
+    # a dict lookup over a whole array at once, anything that's not in `keys` comes back as -1
+    if not len(keys):
+        return np.full(len(wanted), -1, dtype=np.int64)
+
+    order = np.argsort(keys)
+    found = order[np.searchsorted(keys, wanted, sorter=order).clip(max=len(keys) - 1)]
+    return np.where(keys[found] == wanted, values[found], -1)
+
+
+def _build_schedule(the_zip: io.BytesIO, directory: pathlib.Path, /) -> None:
+    # the schedule is far too big to go into postgres (millions of stop times), so instead it gets stored as a set of
+    # numpy arrays on disk, with stop times sorted by (stop, departure time) so that any lookup is just a binary search
+
+    with ZipFile(the_zip, "r") as zipfile:
+        stops = _read_gtfs_table(zipfile, "stops", "stop_id", "stop_code")
+        stop_codes_by_id = {stop_id: stop_code for stop_id, stop_code in stops if stop_code}
+        route_names_by_id = dict(_read_gtfs_table(zipfile, "routes", "route_id", "route_short_name"))
+
+        stop_codes = sorted(set(stop_codes_by_id.values()))
+        stop_index = {code: i for i, code in enumerate(stop_codes)}
+        route_names: Dict[str, int] = {}
+        headsigns: Dict[str, int] = {}
+        services: Dict[str, int] = {}
+
+        trip_index: Dict[str, int] = {}
+        trip_columns = (array("i"), array("i"), array("i"), array("b"))  # route, headsign, service, direction
+        columns = ("trip_id", "route_id", "service_id", "trip_headsign", "direction_id")
+        for trip_id, route_id, service_id, headsign, direction in _read_gtfs_table(zipfile, "trips", *columns):
+            trip_index[trip_id] = len(trip_index)
+            for column, value in zip(
+                trip_columns,
+                (
+                    route_names.setdefault(route_names_by_id.get(route_id, route_id), len(route_names)),
+                    headsigns.setdefault(headsign, len(headsigns)),
+                    services.setdefault(service_id, len(services)),
+                    int(direction or 0),
+                ),
+            ):
+                column.append(value)
+
+        columns = ("trip_id", "departure_time", "stop_id")
+        st_trip_ids, departures, st_stop_ids = _read_gtfs_columns(zipfile, "stop_times", *columns)
+
+        st_stops = _lookup(
+            np.array(list(stop_codes_by_id), dtype=np.str_),
+            np.array([stop_index[code] for code in stop_codes_by_id.values()], dtype=np.int64),
+            st_stop_ids,
+        )
+        st_trips = _lookup(
+            np.array(list(trip_index), dtype=np.str_), np.array(list(trip_index.values()), dtype=np.int64), st_trip_ids
+        )
+
+        # there aren't that many distinct times, so parsing each one just once saves a lot
+        times, time_indexes = np.unique(departures, return_inverse=True)
+        secs = np.array([_gtfs_seconds(t) if t else -1 for t in times], dtype=np.int64)[time_indexes]
+
+        keep = (st_stops >= 0) & (st_trips >= 0) & (secs >= 0)
+        keys = st_stops[keep] << SCHEDULE_TIME_BITS | secs[keep]
+        key_trips = st_trips[keep].astype(np.int32)
+
+        cal_weekdays = np.zeros((len(services), 7), dtype=np.bool_)
+        cal_range = np.zeros((len(services), 2), dtype=np.int32)
+        if "calendar.txt" in zipfile.namelist():
+            days = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+            calendar = _read_gtfs_table(zipfile, "calendar", "service_id", *days, "start_date", "end_date")
+            for service_id, *flags, start, end in calendar:
+                if (i := services.get(service_id, None)) is not None:
+                    cal_weekdays[i] = [flag == "1" for flag in flags]
+                    cal_range[i] = (int(start), int(end))
+
+        exceptions = []
+        if "calendar_dates.txt" in zipfile.namelist():
+            calendar_dates = _read_gtfs_table(zipfile, "calendar_dates", "service_id", "date", "exception_type")
+            for service_id, day, kind in calendar_dates:
+                if (i := services.get(service_id, None)) is not None:
+                    exceptions.append((i, int(day), int(kind)))
+
+    order = np.argsort(keys, kind="stable")
+    arrays = {
+        "stop_codes": np.array(stop_codes, dtype=np.str_),
+        "route_names": np.array(list(route_names), dtype=np.str_),
+        "headsigns": np.array(list(headsigns), dtype=np.str_),
+        "trip_route": np.frombuffer(trip_columns[0], dtype=np.int32),
+        "trip_headsign": np.frombuffer(trip_columns[1], dtype=np.int32),
+        "trip_service": np.frombuffer(trip_columns[2], dtype=np.int32),
+        "trip_direction": np.frombuffer(trip_columns[3], dtype=np.int8),
+        "st_key": keys[order],
+        "st_trip": key_trips[order],
+        "cal_weekdays": cal_weekdays,
+        "cal_range": cal_range,
+        "cal_exceptions": np.array(exceptions, dtype=np.int32).reshape(-1, 3),
+    }
+
+    # every build goes into a directory of its own, and readers only look at the one named in the CURRENT file.
+    # swapping that one file swaps the whole set at once, so nobody ever loads arrays from two different builds
+    directory.mkdir(parents=True, exist_ok=True)
+    version = pathlib.Path(tempfile.mkdtemp(prefix=time.strftime("%Y%m%d%H%M%S-"), dir=directory)).name
+    for name, arr in arrays.items():
+        np.save(directory / version / f"{name}.npy", arr)
+
+    current = directory / "CURRENT"
+    previous = current.read_text().strip() if current.is_file() else None
+
+    tmp = directory / "CURRENT.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, current)
+
+    # the previous build is likely still memory-mapped by the live snapshot, so it stays around until next time
+    for old in directory.iterdir():
+        if old.is_dir() and old.name not in (version, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+class ScheduleStore:
+    """
+    Read-only, memory-mapped view of the scheduled departures from the GTFS data.
+
+    Used for when the live API is having a moment, since the schedule is better than nothing.
+    Instances should be created with `ScheduleStore.load`.
+    """
+
+    FILES = (
+        "stop_codes",
+        "route_names",
+        "headsigns",
+        "trip_route",
+        "trip_headsign",
+        "trip_service",
+        "trip_direction",
+        "st_key",
+        "st_trip",
+        "cal_weekdays",
+        "cal_range",
+        "cal_exceptions",
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray], /) -> None:
+        for name in self.FILES:
+            setattr(self, name, arrays[name])
+
+        self._services_by_day: Dict[int, np.ndarray] = {}
+
+    if TYPE_CHECKING:
+        stop_codes: np.ndarray
+        route_names: np.ndarray
+        headsigns: np.ndarray
+        trip_route: np.ndarray
+        trip_headsign: np.ndarray
+        trip_service: np.ndarray
+        trip_direction: np.ndarray
+        st_key: np.ndarray
+        st_trip: np.ndarray
+        cal_weekdays: np.ndarray
+        cal_range: np.ndarray
+        cal_exceptions: np.ndarray
+
+    @classmethod
+    def load(cls, directory: pathlib.Path, /) -> ScheduleStore | None:
+        try:
+            version = directory / (directory / "CURRENT").read_text().strip()
+            return cls({name: np.load(version / f"{name}.npy", mmap_mode="r") for name in cls.FILES})
+        except (FileNotFoundError, ValueError) as e:
+            log.warning("offline schedule unavailable: %s", e)
+
+    def __contains__(self, stop_code: str) -> bool:
+        return self._stop_index(stop_code) is not None
+
+    def _stop_index(self, stop_code: str, /) -> int | None:
+        idx = int(np.searchsorted(self.stop_codes, stop_code))
+        if idx < len(self.stop_codes) and self.stop_codes[idx] == stop_code:
+            return idx
+
+    def _active_services(self, day: date, /) -> np.ndarray:
+        ymd = int(day.strftime("%Y%m%d"))
+        if (active := self._services_by_day.get(ymd, None)) is not None:
+            return active
+
+        active = self.cal_weekdays[:, day.weekday()] & (self.cal_range[:, 0] <= ymd) & (self.cal_range[:, 1] >= ymd)
+
+        on_day = self.cal_exceptions[self.cal_exceptions[:, 1] == ymd]
+        active[on_day[on_day[:, 2] == 1, 0]] = True  # service added
+        active[on_day[on_day[:, 2] == 2, 0]] = False  # service removed
+
+        # only ever need today and yesterday, so no need to hold onto any more than that
+        if len(self._services_by_day) >= 2:
+            del self._services_by_day[next(iter(self._services_by_day))]
+
+        self._services_by_day[ymd] = active
+        return active
+
+    def departures(self, stop_code: str, /, *, now: datetime) -> List[RouteData] | None:
+        """
+        Returns the next scheduled trips at a stop, in the same shape as the live API's routes.
+        `None` is returned if the stop isn't in the schedule at all.
+        """
+
+        if (stop_idx := self._stop_index(stop_code)) is None:
+            return None
+
+        now = now.astimezone(TRANSIT_TZ)
+        secs = now.hour * 3600 + now.minute * 60 + now.second
+        time_mask = (1 << SCHEDULE_TIME_BITS) - 1
+        found: List[Tuple[int, int]] = []
+
+        # trips that started yesterday can still be running past midnight, those have times like 25:30:00
+        for day, offset in ((now.date(), 0), (now.date() - timedelta(days=1), 86400)):
+            start = stop_idx << SCHEDULE_TIME_BITS | min(secs + offset, time_mask)
+            end = stop_idx << SCHEDULE_TIME_BITS | min(secs + offset + SCHEDULE_WINDOW, time_mask)
+            lo, hi = (int(i) for i in np.searchsorted(self.st_key, (start, end)))
+
+            trips = self.st_trip[lo:hi]
+            keep = self._active_services(day)[self.trip_service[trips]]
+            deps = (self.st_key[lo:hi] & time_mask)[keep] - offset
+            found.extend(zip(deps.tolist(), trips[keep].tolist()))
+
+        routes: Dict[Tuple[int, int], RouteData] = {}
+        for dep, trip in sorted(found):
+            route_no = str(self.route_names[self.trip_route[trip]])
+            headsign = str(self.headsigns[self.trip_headsign[trip]])
+            key = (int(self.trip_route[trip]), int(self.trip_headsign[trip]))
+
+            route = routes.setdefault(
+                key,
+                {
+                    "RouteNo": route_no,
+                    "RouteHeading": headsign,
+                    "DirectionID": int(self.trip_direction[trip]),
+                    "Direction": "",
+                    "Trips": [],
+                },
+            )
+            trips: List[TripData] = route["Trips"]  # type: ignore
+            if len(trips) >= SCHEDULE_TRIPS_PER_ROUTE:
+                continue
+
+            trips.append(
+                {
+                    "Longitude": "",
+                    "Latitude": "",
+                    "GPSSpeed": "",
+                    "TripDestination": headsign,
+                    "TripStartTime": "",
+                    "AdjustedScheduleTime": str((dep - secs) // 60),
+                    "AdjustmentAge": "-1",  # no gps data, so it'll display the same as any other unadjusted trip
+                    "LastTripOfSchedule": False,
+                    "BusType": "",
+                    "RouteNo": route_no,
+                }
+            )
+
+        return list(routes.values())
+
+
 FONT = ImageFont.truetype("assets/opensans.ttf", 72)
 DEFAULT_ROUTE_COLOUR = ("E6E6E6", "58595B")
+ROUTE_ICON_DIR: pathlib.Path | None = pathlib.Path("cache/route-icons")  # set to None to keep icons in memory only
 
 
-def _generate_route_icon(route: str, /) -> Coroutine[Any, Any, File]:
-    def runner():
-        bg_colour, text_colour = route_colour_cache.get(route, DEFAULT_ROUTE_COLOUR)
+def _render_route_icon(route: str, bg_colour: str, text_colour: str, /) -> bytes:
+    # icons only ever change if OC Transpo recolours a route, so the colours are part of the filename
+    path = ROUTE_ICON_DIR / f"{route}-{bg_colour}-{text_colour}.png" if ROUTE_ICON_DIR else None
+    if path is not None and path.is_file():
+        return path.read_bytes()
 
-        buffer = io.BytesIO()
-        img = Image.open(f"assets/{bg_colour}.png")
+    if not os.path.isfile(f"assets/{bg_colour}.png"):
+        log.warning("no background asset for colour %s (route %s), using default", bg_colour, route)
+        bg_colour, text_colour = DEFAULT_ROUTE_COLOUR
+
+    buffer = io.BytesIO()
+    with Image.open(f"assets/{bg_colour}.png") as img:
         draw = ImageDraw.Draw(img)
 
         textsize = FONT.getbbox(route)
@@ -161,11 +707,108 @@ def _generate_route_icon(route: str, /) -> Coroutine[Any, Any, File]:
         draw.text((x, y), route, fill="#" + text_colour, font=FONT)
 
         img.save(buffer, "png")
-        buffer.seek(0)
 
-        return discord.File(buffer, "penis.png", description="eat my balls")
+    rendered = buffer.getvalue()
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(rendered)
+        except OSError as e:
+            log.warning("could not write route icon to disk: %s", e)
+
+    return rendered
+
+
+def _render_route_icons(colours: Mapping[str, Tuple[str, str]], /) -> Dict[str, bytes]:
+    return {route: _render_route_icon(route, *colour) for route, colour in colours.items()}
+
+
+class GTFSSnapshot:
+    """
+    Everything derived from one build of the GTFS data: route colours and icons, the stops table
+    (along with its search and location indexes), and the offline schedule.
+
+    Snapshots are never modified after being built. A rebuild makes an entirely new one off the event loop,
+    which then replaces the old one in a single assignment, so readers never see a half-built state
+    and anything that's still holding onto the old one (eg: an open menu) keeps working as is.
+    Instances should be created with `GTFSSnapshot.build`.
+
+    Parameters
+    ----------
+    version: `int`
+        Incremented every rebuild, purely for bookkeeping.
+    route_colours: `Mapping[str, Tuple[str, str]]`
+        Route number -> (background colour, text colour).
+    route_icons: `Mapping[str, bytes]`
+        Route number -> pre-rendered PNG icon.
+    stops: `StopTable`
+        The stops table.
+    schedule: `ScheduleStore | None`
+        The offline schedule, if there is one.
+    """
+
+    __slots__ = ("version", "built_at", "route_colours", "route_icons", "stops", "schedule")
+
+    def __init__(
+        self,
+        version: int,
+        *,
+        route_colours: Mapping[str, Tuple[str, str]],
+        route_icons: Mapping[str, bytes],
+        stops: StopTable,
+        schedule: ScheduleStore | None,
+    ) -> None:
+        self.version = version
+        self.built_at = datetime.now()
+        self.route_colours = MappingProxyType(dict(route_colours))
+        self.route_icons = MappingProxyType(dict(route_icons))
+        self.stops = stops
+        self.schedule = schedule
+
+    @classmethod
+    def build(
+        cls,
+        version: int,
+        /,
+        *,
+        routes: Iterable[Tuple[str, str, str]],
+        stops: Iterable[StopInfo],
+        schedule_dir: pathlib.Path,
+    ) -> GTFSSnapshot:
+        """
+        Builds a snapshot from the rows of the `routes` and `stops` tables, and the schedule in `schedule_dir`.
+        This blocks for a good while, so it should be run in a thread.
+        """
+
+        colours = {name: (bg, text) for name, bg, text in routes}
+        return cls(
+            version,
+            route_colours=colours,
+            route_icons=_render_route_icons(colours),
+            stops=StopTable(stops),
+            schedule=ScheduleStore.load(schedule_dir),
+        )
+
+    @classmethod
+    def empty(cls) -> GTFSSnapshot:
+        return cls(0, route_colours={}, route_icons={}, stops=StopTable([]), schedule=None)
+
+
+# swapped out wholesale by `Transit._load_gtfs`, never modified in place
+gtfs_data = GTFSSnapshot.empty()
 
-    return asyncio.to_thread(runner)
+# icons for routes that aren't in the gtfs data (yet?), rendered as they come up. these always get the default
+# colours, so unlike everything else they don't belong to any one snapshot. only ever touched from the event loop
+_extra_route_icons: Dict[str, bytes] = {}
+
+
+async def _generate_route_icon(route: str, /) -> File:
+    if (rendered := gtfs_data.route_icons.get(route, None)) is None:
+        if (rendered := _extra_route_icons.get(route, None)) is None:
+            rendered = await asyncio.to_thread(_render_route_icon, route, *DEFAULT_ROUTE_COLOUR)
+            _extra_route_icons[route] = rendered
+
+    return discord.File(io.BytesIO(rendered), "penis.png", description="eat my balls")
 
 
 async def _view_edit_kwargs(view: BusDisplay, *, as_send: bool = False) -> Dict[str, Any]:
@@ -180,7 +823,7 @@ async def _view_edit_kwargs(view: BusDisplay, *, as_send: bool = False) -> Dict[
 
     return {
         file_key: attachments,
-        "embed": view.pages[view.current_key],
+        "embed": view.get_page(view.current_key),
         "view": view,
     }
 
@@ -202,6 +845,199 @@ class Sorting(Enum):
     DEST = 2
 
 
+class OCTranspoClient:
+    """
+    HTTP client for the OC Transpo API.
+
+    Requests are rate limited with a token bucket, and each has a deadline covering both the wait for a token
+    and the request itself. Consecutive failures trip a circuit breaker, after which requests fail immediately
+    until the API has had some time to recover. Any of these failing raises `BadResponse`,
+    so callers can fall back on the offline schedule like they would for any other bad response.
+
+    Parameters
+    ----------
+    app_id: `str`
+        The API app ID.
+    api_key: `str`
+        The API key.
+    """
+
+    def __init__(self, app_id: str, api_key: str, /) -> None:
+        self.app_id = app_id
+        self.api_key = api_key
+
+        self.limiter = TokenBucket(OCTRANSPO_RATE, OCTRANSPO_BURST)
+        self.breaker = CircuitBreaker(OCTRANSPO_BREAKER_THRESHOLD, OCTRANSPO_BREAKER_RESET)
+        self.latency = LatencyTracker()
+        self.timeouts = 0
+        self.rejected = 0
+        self.throttled = 0
+
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # made on first use, since sessions have to be created from within the event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=OCTRANSPO_CONNECTIONS, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.times_opened,
+            **self.latency.stats,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "tokens": round(self.limiter.tokens, 1),
+        }
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def next_trips(self, stop_code: str, /) -> str:
+        """
+        Returns the raw response for a stop's next trips.
+        """
+
+        try:
+            self.breaker.check()
+        except CircuitOpen as e:
+            self.rejected += 1
+            raise BadResponse(f"OC Transpo is having issues, not trying again for {e.retry_after:.0f}s") from e
+
+        url = f"{OCTRANSPO_API}/GetNextTripsForStopAllRoutes"
+        params = {"appID": self.app_id, "apiKey": self.api_key, "stopNo": stop_code, "format": "json"}
+        start = time.monotonic()
+
+        try:
+            async with asyncio.timeout(OCTRANSPO_TIMEOUT):
+                if await self.limiter.acquire() > 0:
+                    self.throttled += 1
+
+                async with self.session.get(url, params=params) as res:
+                    raw = await res.text()
+                    status = res.status
+        except TimeoutError as e:
+            self.timeouts += 1
+            self._record(start, error=True)
+            raise BadResponse(f"OC Transpo took longer than {OCTRANSPO_TIMEOUT}s to respond") from e
+        except aiohttp.ClientError as e:
+            self._record(start, error=True)
+            raise BadResponse(f"couldn't reach OC Transpo ({e.__class__.__name__})") from e
+        except BaseException:
+            # cancelled, this says nothing about whether the API's up or not
+            self.breaker.release()
+            raise
+
+        if status >= 500:
+            self._record(start, error=True)
+            raise BadResponse(f"OC Transpo responded with status {status}", raw=raw)
+
+        self._record(start, error=False)
+        return raw
+
+    def _record(self, start: float, /, *, error: bool) -> None:
+        self.latency.record(time.monotonic() - start, error=error)
+        if error:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+
+class LiveBoardPoller:
+    """
+    Keeps live departure boards up to date.
+
+    Each stop gets one polling task no matter how many messages are showing it, and every subscribed
+    message is updated from that single fetch. The polling interval grows with the amount of subscribers,
+    as well as with how long the previous round of edits took (which is where Discord's rate limits show up,
+    since the library waits them out for us).
+
+    Parameters
+    ----------
+    trip_fetcher: `TripFetcher`
+        The function used to fetch a stop's trips.
+    """
+
+    def __init__(self, trip_fetcher: TripFetcher) -> None:
+        self._trip_fetcher = trip_fetcher
+        self._subscribers: Dict[str, Dict[BusDisplay, float]] = {}  # stop code -> {view: expires at}
+        self._edit_times: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task[None]] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "stops": len(self._tasks),
+            "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+        }
+
+    def interval(self, stop_code: str, /) -> float:
+        count = len(self._subscribers.get(stop_code, ()))
+        wanted = max(count * LIVE_EDIT_SPACING, 2 * self._edit_times.get(stop_code, 0))
+
+        return min(LIVE_MAX_INTERVAL, max(LIVE_MIN_INTERVAL, wanted))
+
+    def is_subscribed(self, view: BusDisplay, stop_code: str, /) -> bool:
+        return view in self._subscribers.get(stop_code, ())
+
+    def subscribe(self, view: BusDisplay, stop_code: str, /) -> None:
+        self._subscribers.setdefault(stop_code, {})[view] = time.monotonic() + LIVE_MAX_DURATION
+
+        if stop_code not in self._tasks:
+            self._tasks[stop_code] = asyncio.create_task(self._poll(stop_code))
+
+    def unsubscribe(self, view: BusDisplay, stop_code: str, /) -> None:
+        self._subscribers.get(stop_code, {}).pop(view, None)
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def _poll(self, stop_code: str, /) -> None:
+        subscribers = self._subscribers[stop_code]
+        try:
+            while subscribers:
+                await asyncio.sleep(self.interval(stop_code))
+
+                now = time.monotonic()
+                expired = [v for v, expiry in subscribers.items() if expiry <= now or v.is_finished()]
+                for view in expired:
+                    del subscribers[view]
+
+                # let whoever's board ran out of time know that it's no longer live
+                await asyncio.gather(*(v.end_live_updates() for v in expired if not v.is_finished()))
+                if not subscribers:
+                    break
+
+                try:
+                    data = await self._trip_fetcher(stop_code)
+                except (OCTranspoError, BadResponse):
+                    continue  # try again next round, the boards just keep showing what they had
+
+                started = time.monotonic()
+                views = tuple(subscribers)
+                results = await asyncio.gather(*(v.apply_live_update(data) for v in views), return_exceptions=True)
+                self._edit_times[stop_code] = time.monotonic() - started
+
+                for view, result in zip(views, results):
+                    if isinstance(result, discord.HTTPException):
+                        subscribers.pop(view, None)  # message deleted, token expired, etc.
+                    elif isinstance(result, Exception):
+                        log.error("error updating live board for stop %s", stop_code, exc_info=result)
+        finally:
+            del self._tasks[stop_code]
+            self._edit_times.pop(stop_code, None)
+            if self._subscribers.get(stop_code, None) is subscribers and not subscribers:
+                del self._subscribers[stop_code]
+
+
 class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
     if TYPE_CHECKING:
         _destinations: Tuple[List[str], ...]
@@ -211,7 +1047,8 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
             return self.__init__.__await__
 
     TIMEOUT = 120
-    pages: Dict[str, Embed] = {}
+    ROUTES_PER_BOARD_PAGE = 20
+
     group: int = 0
     departure_page: int = 0
     sorting: Sorting = Sorting.ROUTE
@@ -220,38 +1057,29 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
         self,
         *,
         data: BusStopResponse,
-        db: PostgresPool,
+        stops: StopTable,
         owner: User | Member,
         trip_fetcher: TripFetcher,
         skip_components: bool = False,
     ):
-        assert data["Routes"]["Route"] is not None
-        trips, routes_raw = _get_trips_and_routes(data["Routes"]["Route"])
-
-        destinations = _sort_destinations(trips)
-        routes = _sort_routes(routes_raw)
-
         super().__init__(timeout=self.TIMEOUT)
 
-        query = "SELECT * FROM stops WHERE stop_code = $1"
-        self._stop_info: StopInfo = await db.fetchrow(query, data["StopNo"])  # type: ignore
+        self._stop_info: StopInfo = stops.get(data["StopNo"]) or {
+            # stop's not in the gtfs data, most likely one that got added since the last rebuild
+            "stop_code": data["StopNo"],
+            "stop_name": Transit.title(data["StopDescription"]),
+            "stop_lat": "",
+            "stop_lon": "",
+        }
 
         self._owner = owner
-        self._data = data
-        self._db = db
-        self._destinations = _slice(destinations)
-        self._destination_count = len(destinations)
+        self._stops = stops
         self._trip_fetcher = trip_fetcher
-
-        spoof = [("", "")]  # spoof item, this will be the select option for the departure board
-        self._routes = _slice(spoof + [r[:2] for r in routes])
-        self._route_count = len(routes)
+        self._live_editor: EditFunc | None = None
+        self._load_data(data)
 
         self.current_key = "r::0"  # departure board page 1
 
-        self._build_route_pages(routes)
-        self._build_departure_board_pages(routes)
-        self._build_destination_pages(destinations)
         if not skip_components:
             self.update_components()
 
@@ -270,6 +1098,73 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
 
         return True
 
+    def _load_data(self, data: BusStopResponse, /) -> None:
+        assert data["Routes"]["Route"] is not None
+        trips, routes_raw = _get_trips_and_routes(data["Routes"]["Route"])
+        routes = _sort_routes(routes_raw)
+
+        # pages are only built once they're actually looked at (see `get_page`)
+        # so we just index everything here, in a single pass over the trips
+        self._data = data
+        self._scheduled = data.get("Scheduled", False)
+        self._fetched_at = datetime.now()
+        self.pages: Dict[str, Embed] = {}
+
+        self._trips_by_destination = _index_destinations(trips)
+        self._destinations = _slice(list(self._trips_by_destination))
+        self._destination_count = len(self._trips_by_destination)
+
+        self._routes_by_key = {f"r:{headsign}:{route_no}": (headsign, route_no, t) for headsign, route_no, t in routes}
+        self._board_chunks = _slice(routes, size=self.ROUTES_PER_BOARD_PAGE)
+        self._departure_page_count = len(self._board_chunks)
+
+        spoof = [("", "")]  # spoof item, this will be the select option for the departure board
+        self._routes = _slice(spoof + [r[:2] for r in routes])
+        self._route_count = len(routes)
+
+    def get_page(self, key: str, /) -> Embed | None:
+        """
+        Returns the page for the given key, building it if it hasn't been viewed yet.
+        `None` is returned if the key doesn't correspond to any page for the current data.
+        """
+
+        if (page := self.pages.get(key, None)) is None:
+            if (page := self._build_page(key)) is not None:
+                self.pages[key] = page
+
+        return page
+
+    def has_page(self, key: str, /) -> bool:
+        """
+        Whether the key corresponds to a page for the current data, without building said page.
+        """
+
+        return key in self.pages or self._page_builder(key) is not None
+
+    def _page_builder(self, key: str, /) -> Callable[[], Embed] | None:
+        if key.startswith("d:"):
+            dest = key[2:]
+            if (trips := self._trips_by_destination.get(dest, None)) is None:
+                return None
+
+            return partial(self._build_destination_page, dest, trips)
+
+        if key.startswith("r::"):
+            idx = key[3:]
+            if not idx.isdigit() or int(idx) >= self._departure_page_count:
+                return None
+
+            return partial(self._build_departure_board_page, int(idx))
+
+        if (route := self._routes_by_key.get(key, None)) is None:
+            return None
+
+        return partial(self._build_route_page, *route)
+
+    def _build_page(self, key: str, /) -> Embed | None:
+        builder = self._page_builder(key)
+        return builder() if builder is not None else None
+
     def reconfigure_with_key(self, key: str, /) -> None:
         self.current_key = key
         if key.startswith("d:"):
@@ -300,6 +1195,24 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
     def _make_custom_id(self) -> str:
         return f"★;{self._stop_info['stop_code']};{self.current_key};{round(time.time())}"
 
+    @staticmethod
+    def parse_custom_id(custom_id: str, /) -> Tuple[str, str, int] | None:
+        """
+        Decodes the state stored in the first component's custom id by `_make_custom_id`,
+        returning the stop code, current page key, and when the view was last active.
+        """
+
+        if not custom_id.startswith("★;"):
+            return None
+
+        # page keys can have just about anything in them (destination names), so split from both ends
+        stop_code, _, rest = custom_id[2:].partition(";")
+        key, _, last_active = rest.rpartition(";")
+        if not stop_code or not last_active.isdigit():
+            return None
+
+        return stop_code, key, int(last_active)
+
     def _add_trip_fields_to_embed(self, embed: Embed, /, *, trips: List[TripData]) -> None:
         for i, trip in enumerate(trips[:3], start=1):
             name = f"Trip {i}"
@@ -307,7 +1220,7 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
                 embed.add_field(name=name, value="No data")
                 continue
 
-            cums_at = round((datetime.now() + timedelta(minutes=int(trip["AdjustedScheduleTime"]))).timestamp())
+            cums_at = round((self._fetched_at + timedelta(minutes=int(trip["AdjustedScheduleTime"]))).timestamp())
 
             arrives = f"**<t:{cums_at}:R>**"
             gps = f"GPS-adjusted? {BotEmojis.NO}"
@@ -329,10 +1242,11 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
     def _build_next_three_embed(self, item: str, value: str, /, *, route_no: str | None = None) -> Embed:
         e = discord.Embed(
             title=f"Next 3 trips for {item} {value}",
-            timestamp=datetime.now(),
+            timestamp=self._fetched_at,
         )
         e.set_author(name=f"Bus Arrivals - {self._stop_info['stop_name']} [#{self._stop_info['stop_code']}]")
-        e.set_footer(text=f"Sorting by {item}", icon_url=getattr(self._owner.avatar, "url", None))
+        footer = f"Sorting by {item}{SCHEDULED_NOTE if self._scheduled else ''}"
+        e.set_footer(text=footer, icon_url=getattr(self._owner.avatar, "url", None))
         e.set_thumbnail(url="attachment://penis.png")
 
         if item == "route" and route_no is not None:
@@ -351,7 +1265,7 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
             to_add = f"**{minutes}***" if minutes > 1 else BotEmojis.BUS_FLASHING
 
         elif minutes >= 60:
-            cums_at = datetime.now() + timedelta(minutes=minutes)
+            cums_at = self._fetched_at + timedelta(minutes=minutes)
             to_add = cums_at.strftime("%H:%M")
 
         else:  # scheduled in under an hour, no gps tracking available
@@ -383,46 +1297,31 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
 
         return "\n".join(description_lines)
 
-    def _build_departure_board_pages(self, routes: RouteCollection, /) -> None:
-        ROUTES_PER_PAGE = 20
+    def _build_departure_board_page(self, idx: int, /) -> Embed:
+        chunk = self._board_chunks[idx]
 
-        sliced_routes = _slice(routes, size=ROUTES_PER_PAGE)
-        self._departure_page_count = len(sliced_routes)
-        for idx, chunk in enumerate(sliced_routes):
-            key = f"r::{idx}"
+        max_route_length = len(max(chunk, key=lambda x: len(x[1]))[1])
+        desc = self._make_board_description(chunk, max_route_length)
+        rn = self._fetched_at
+        e = discord.Embed(title="All upcoming departures", description=desc, url=PLACEHOLDER_URL, timestamp=rn)
+        e.set_author(name=f"Departure Board - {self._stop_info['stop_name']} [#{self._stop_info['stop_code']}]")
+        e.set_footer(text=f"Page {idx + 1}/{self._departure_page_count}{SCHEDULED_NOTE if self._scheduled else ''}")
 
-            rn = datetime.now()
-            max_route_length = len(max(chunk, key=lambda x: len(x[1]))[1])
-            desc = self._make_board_description(chunk, max_route_length)
-            e = discord.Embed(title="All upcoming departures", description=desc, url=PLACEHOLDER_URL, timestamp=rn)
-            e.set_author(name=f"Departure Board - {self._stop_info['stop_name']} [#{self._stop_info['stop_code']}]")
-            e.set_footer(text=f"Page {idx + 1}/{len(sliced_routes)}")
-            self.pages[key] = e
-
-    def _build_route_pages(self, routes: RouteCollection, /) -> None:
-        for headsign, route_no, trips in routes:
-            key = f"r:{headsign}:{route_no}"
-
-            fullroute = f"[{route_no}] {headsign}"
-            term = "line" if route_no in RAIL else "route"
-            e = self._build_next_three_embed(term, fullroute, route_no=route_no)
-            self._add_trip_fields_to_embed(e, trips=trips)
-            self.pages[key] = e
+        return e
 
-    def _build_destination_pages(self, destinations: List[str], /) -> None:
-        assert self._data["Routes"]["Route"] is not None
+    def _build_route_page(self, headsign: str, route_no: str, trips: List[TripData], /) -> Embed:
+        fullroute = f"[{route_no}] {headsign}"
+        term = "line" if route_no in RAIL else "route"
+        e = self._build_next_three_embed(term, fullroute, route_no=route_no)
+        self._add_trip_fields_to_embed(e, trips=trips)
 
-        for dest in destinations:
-            key = f"d:{dest}"
+        return e
 
-            e = self._build_next_three_embed("destination", dest)
-            trips = sorted(
-                (t for t in _get_trips_and_routes(self._data["Routes"]["Route"])[0] if t["TripDestination"] == dest),
-                key=lambda x: int(x["AdjustedScheduleTime"]),
-            )[:3]
+    def _build_destination_page(self, dest: str, trips: List[TripData], /) -> Embed:
+        e = self._build_next_three_embed("destination", dest)
+        self._add_trip_fields_to_embed(e, trips=trips[:3])
 
-            self._add_trip_fields_to_embed(e, trips=trips)
-            self.pages[key] = e
+        return e
 
     def _count_shown(self, *, group_index: int, group_size: int = 25) -> str:
         offset = 1 if not group_index else 0
@@ -472,6 +1371,8 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
         if_dep_board: Callable[[bool], bool] = lambda c: c if self.departure_board_selected else True
 
         self.children[0].custom_id = self._make_custom_id()
+        self.toggle_live.label = "Live: on" if self._live_editor else "Live: off"
+        self.toggle_live.style = discord.ButtonStyle.success if self._live_editor else discord.ButtonStyle.secondary
         self.previous_25.disabled = self.group == 0 and if_dep_board(self.departure_page == 0)
         self.next_25.disabled = self.group >= len(self.collection) - 1 and if_dep_board(
             self.departure_page >= self._departure_page_count - 1
@@ -525,26 +1426,9 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
         except BadResponse as e:
             return await interaction.followup.send(f"{str(e)}\n```json\n{e.raw!r}```", ephemeral=True)
 
-        assert new_data["Routes"]["Route"] is not None
-        trips, routes_raw = _get_trips_and_routes(new_data["Routes"]["Route"])
-
-        destinations = _sort_destinations(trips)
-        routes = _sort_routes(routes_raw)
-
-        self._data = new_data
-        self._destinations = _slice(destinations)
-        self._destination_count = len(destinations)
-
-        spoof = [("", "")]  # spoof item, this will be the select option for the departure board
-        self._routes = _slice(spoof + [r[:2] for r in routes])
-        self._route_count = len(routes)
-
-        self.pages = {}
-        self._build_route_pages(routes)
-        self._build_departure_board_pages(routes)
-        self._build_destination_pages(destinations)
+        self._load_data(new_data)
 
-        page = self.pages.get(self.current_key, None)
+        page = self.get_page(self.current_key)
         if not page:
             self.current_key = "r::0"  # departure board first page
             self.sorting = Sorting.ROUTE
@@ -595,9 +1479,55 @@ class BusDisplay(View, auto_defer=False, metaclass=AsyncInit):
             # responded in on_interaction
             return
 
-        modal = NewLookupModal(og_view=self, db=self._db, trip_fetcher=self._trip_fetcher)
+        modal = NewLookupModal(og_view=self, stops=self._stops, trip_fetcher=self._trip_fetcher)
         await interaction.response.send_modal(modal)
 
+    @ui.button(label="Live: off", row=2, custom_id="live")
+    async def toggle_live(self, interaction: Interaction, item: ui.Button):
+        cog: Transit | None = interaction.client.get_cog("Transit")  # type: ignore
+        if cog is None:
+            return await interaction.response.send_message("live boards are unavailable right now", ephemeral=True)
+
+        stop_code = self._stop_info["stop_code"]
+        if cog.live_boards.is_subscribed(self, stop_code):
+            cog.live_boards.unsubscribe(self, stop_code)
+            self._live_editor = None
+        else:
+            cog.live_boards.subscribe(self, stop_code)
+            self._live_editor = interaction.edit_original_response
+
+        self.update_components()
+        kwargs = await _view_edit_kwargs(self)
+        await interaction.extras["editor"](**kwargs)
+
+    async def apply_live_update(self, data: BusStopResponse, /) -> None:
+        assert self._live_editor is not None
+
+        self._load_data(data)
+        if self.get_page(self.current_key) is None:
+            # whatever was being looked at has no more trips, same deal as with the refresh button
+            self.current_key = "r::0"
+            self.sorting = Sorting.ROUTE
+            self.swap_sorting.label = "Sort by destination"
+            self.group = self.departure_page = 0
+
+        self._refresh_timeout()
+        self.update_components()
+        kwargs = await _view_edit_kwargs(self)
+        await self._live_editor(**kwargs)
+
+    async def end_live_updates(self) -> None:
+        if (editor := self._live_editor) is None:
+            return
+
+        self._live_editor = None
+        self.update_components()
+
+        try:
+            await editor(view=self)
+        except discord.HTTPException:
+            pass  # we tried
+
 
 class ResultSelector(View, auto_defer=True):
     def __init__(
@@ -605,14 +1535,14 @@ class ResultSelector(View, auto_defer=True):
         results: List[StopInfo],
         /,
         *,
-        db: PostgresPool,
+        stops: StopTable,
         trip_fetcher: TripFetcher,
         message_editor: EditFunc,
         owner: User | Member,
         og_view: BusDisplay | None = None,
     ) -> None:
         self._results = results
-        self._db = db
+        self._stops = stops
         self._message_editor = message_editor
         self._trip_fetcher = trip_fetcher
         self._owner = owner
@@ -647,16 +1577,17 @@ class ResultSelector(View, auto_defer=True):
         transitway = []
         stops = []
         for r in self._results:
-            if r["stop_name"].endswith(" Stn."):
-                label = f"★  [{r['stop_code']}] {r['stop_name']}"
+            if r["stop_code"].startswith(STATION_PREFIX):
+                description = "Every platform at this station"
+                store = transitway
+            elif r["stop_name"].endswith(" Stn."):
                 description = "Transitway station"
                 store = transitway
             else:
-                label = f"[{r['stop_code']}] {r['stop_name']}"
                 description = "Bus stop"
                 store = stops
 
-            store.append(discord.SelectOption(label=label, description=description, value=r["stop_code"]))
+            store.append(discord.SelectOption(label=_stop_label(r), description=description, value=r["stop_code"]))
 
         self.selector.options = transitway + stops
 
@@ -677,7 +1608,7 @@ class ResultSelector(View, auto_defer=True):
         assert data["Routes"]["Route"] is not None
         view = await BusDisplay(
             data=data,
-            db=self._db,
+            stops=self._stops,
             owner=interaction.user,
             trip_fetcher=self._trip_fetcher,
         )
@@ -701,22 +1632,22 @@ class ResultSelector(View, auto_defer=True):
     async def new_lookup(self, interaction: Interaction, item: ui.Button):
         self.stop()
 
-        modal = NewLookupModal(og_view=self._og_view, db=self._db, trip_fetcher=self._trip_fetcher)
+        modal = NewLookupModal(og_view=self._og_view, stops=self._stops, trip_fetcher=self._trip_fetcher)
         await interaction.response.send_modal(modal)
 
 
 class NewLookupModal(ui.Modal, title="Bus Stop Lookup"):
     search = ui.TextInput(label="Search")
 
-    def __init__(self, *, og_view: BusDisplay | None = None, db: PostgresPool, trip_fetcher: TripFetcher) -> None:
+    def __init__(self, *, og_view: BusDisplay | None = None, stops: StopTable, trip_fetcher: TripFetcher) -> None:
         self._og_view = og_view
-        self._db = db
+        self._stops = stops
         self._trip_fetcher = trip_fetcher
         super().__init__()
 
     async def on_submit(self, interaction: Interaction):
         search = self.search.value
-        if search.isnumeric() and len(search) == 4:
+        if search.isnumeric() and len(search) == 4 or self._stops.station_codes(search):
             await interaction.response.defer()
 
             try:
@@ -729,7 +1660,7 @@ class NewLookupModal(ui.Modal, title="Bus Stop Lookup"):
             assert data["Routes"]["Route"] is not None
             view = await BusDisplay(
                 data=data,
-                db=self._db,
+                stops=self._stops,
                 owner=interaction.user,
                 trip_fetcher=self._trip_fetcher,
             )
@@ -740,7 +1671,7 @@ class NewLookupModal(ui.Modal, title="Bus Stop Lookup"):
             kwargs = await _view_edit_kwargs(view)
             return await interaction.edit_original_response(**kwargs)
 
-        top_results: List[StopInfo] = await self._db.fetch(stop_search_query(10), search)
+        top_results = self._stops.search(search, limit=10)
         if not top_results:
             return await interaction.response.send_message("nothing found...?", ephemeral=True)
 
@@ -753,7 +1684,7 @@ class NewLookupModal(ui.Modal, title="Bus Stop Lookup"):
         view = ResultSelector(
             top_results,
             og_view=self._og_view,
-            db=self._db,
+            stops=self._stops,
             trip_fetcher=self._trip_fetcher,
             message_editor=interaction.edit_original_response,
             owner=interaction.user,
@@ -766,6 +1697,10 @@ class Transit(commands.Cog):
         self.client = client
         self._debug = False
 
+        self.api = OCTranspoClient(client.transit_id, client.transit_token)
+        self.trip_cache: CoalescingCache[str, BusStopResponse] = CoalescingCache(TRIP_CACHE_TTL)
+        self.live_boards = LiveBoardPoller(self.fetch_trips)
+
     @cached_property
     def item_indexes(self) -> Dict[str, int]:
         indexes = {}
@@ -795,14 +1730,13 @@ class Transit(commands.Cog):
         items = interaction.message.components
         first = items[0].children[0] if isinstance(items[0], discord.ActionRow) else items[0]
 
-        assert first.custom_id is not None
-        if not first.custom_id.startswith("★"):
+        if first.custom_id is None or (state := BusDisplay.parse_custom_id(first.custom_id)) is None:
             return
 
-        stop_code, current_key, last_active_str = first.custom_id.split(";")[-3:]
+        stop_code, current_key, last_active = state
 
-        view_expired = int(last_active_str) + BusDisplay.TIMEOUT < time.time()
-        bot_restarted = int(last_active_str) < self.client.uptime.timestamp() < int(last_active_str) + BusDisplay.TIMEOUT
+        view_expired = last_active + BusDisplay.TIMEOUT < time.time()
+        bot_restarted = last_active < self.client.uptime.timestamp() < last_active + BusDisplay.TIMEOUT
         if not view_expired and not bot_restarted:
             # the view hasn't yet expired; handle interaction check in there
             return
@@ -817,7 +1751,7 @@ class Transit(commands.Cog):
         interaction.extras["editor"] = interaction.edit_original_response
         if child_idx == 6:
             # we can only send modals in responses, so we've gotta do it here
-            modal = NewLookupModal(db=self.client.db, trip_fetcher=self.fetch_trips)
+            modal = NewLookupModal(stops=self.stops, trip_fetcher=self.fetch_trips)
             return await interaction.response.send_modal(modal)
         else:
             await interaction.response.defer()
@@ -831,11 +1765,13 @@ class Transit(commands.Cog):
 
         assert new_data["Routes"]["Route"] is not None
         view = await BusDisplay(
-            data=new_data, db=self.client.db, owner=interaction.user, trip_fetcher=self.fetch_trips, skip_components=True
+            data=new_data, stops=self.stops, owner=interaction.user, trip_fetcher=self.fetch_trips, skip_components=True
         )
 
-        page = view.pages.get(current_key, None)
-        if page is not None:
+        # only the page that ends up being shown gets built, which isn't necessarily this one
+        # (eg: the click was on one of the arrows), so just check that it's there for now
+        page_found = view.has_page(current_key)
+        if page_found:
             view.reconfigure_with_key(current_key)
 
         elif child_idx == 4:
@@ -849,7 +1785,7 @@ class Transit(commands.Cog):
             kwargs = await _view_edit_kwargs(view)
             await interaction.edit_original_response(**kwargs)
 
-            if not page:
+            if not page_found:
                 await interaction.followup.send(RELOAD_FAIL, ephemeral=True)
 
             return
@@ -881,7 +1817,36 @@ class Transit(commands.Cog):
             .replace("Toh", "T.O.H.")
         )
 
+    # these always go through the current snapshot, see `GTFSSnapshot`
+
+    @property
+    def stops(self) -> StopTable:
+        return gtfs_data.stops
+
+    @property
+    def schedule(self) -> ScheduleStore | None:
+        return gtfs_data.schedule
+
+    async def _load_gtfs(self) -> GTFSSnapshot:
+        global gtfs_data
+
+        routes = await self.client.db.fetch("SELECT route_short_name, route_color, route_text_color FROM routes")
+        stops: List[StopInfo] = await self.client.db.fetch("SELECT * FROM stops")
+
+        snapshot = await asyncio.to_thread(
+            GTFSSnapshot.build,
+            gtfs_data.version + 1,
+            routes=[tuple(r) for r in routes],
+            stops=stops,
+            schedule_dir=SCHEDULE_DIR,
+        )
+
+        gtfs_data = snapshot
+        return snapshot
+
     async def cog_load(self):
+        await self._load_gtfs()
+
         now = datetime.now()
         midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
         until_midnight = midnight - now
@@ -892,19 +1857,64 @@ class Transit(commands.Cog):
 
     async def cog_unload(self):
         self.gtfs_task.cancel()
+        self.live_boards.close()
+        await self.api.close()
 
     async def fetch_trips(self, stop_code: str, /) -> BusStopResponse:
-        url = "https://api.octranspo1.com/v2.0/GetNextTripsForStopAllRoutes"
-        params = {
-            "appID": self.client.transit_id,
-            "apiKey": self.client.transit_token,
-            "stopNo": stop_code,
-            "format": "json",
-        }
+        if codes := self.stops.station_codes(stop_code):
+            return await self._fetch_station(stop_code, codes)
+
+        # popular stations get looked up by multiple people at the same time quite often
+        # so we'll share one request between all of them, and hold onto the result for a bit
+        try:
+            return await self.trip_cache.get(stop_code, partial(self._fetch_trips, stop_code))
+        except BadResponse:
+            if (scheduled := self._scheduled_trips(stop_code)) is None:
+                raise
+
+            log.warning("live trips for stop %s unavailable, falling back to the schedule", stop_code)
+            return scheduled
+
+    async def _fetch_station(self, key: str, codes: Tuple[str, ...], /) -> BusStopResponse:
+        semaphore = asyncio.Semaphore(STATION_FETCH_CONCURRENCY)
+
+        async def fetch_one(code: str) -> BusStopResponse:
+            async with semaphore:
+                return await asyncio.wait_for(self.fetch_trips(code), timeout=STATION_FETCH_TIMEOUT)
+
+        # every platform gets fetched at once, so the whole thing only takes as long as the slowest one
+        results = await asyncio.gather(*(fetch_one(code) for code in codes), return_exceptions=True)
+        responses: List[BusStopResponse] = [r for r in results if not isinstance(r, BaseException)]
+        station = self.stops.get(key)
+        assert station is not None
+
+        if not responses:
+            if all(isinstance(r, OCTranspoError) for r in results):
+                raise OCTranspoError(no_routes_at_stop(station["stop_name"]))
+
+            bad = next((r for r in results if isinstance(r, BadResponse)), None)
+            raise BadResponse("couldn't fetch any of this station's platforms", raw=getattr(bad, "raw", ""))
+
+        return _merge_station_responses(key, station["stop_name"], responses)
 
-        async with self.client.session.get(url, params=params) as res:
-            raw = await res.text()
+    def _scheduled_trips(self, stop_code: str, /) -> BusStopResponse | None:
+        if self.schedule is None or (stop := self.stops.get(stop_code)) is None:
+            return None
 
+        routes = self.schedule.departures(stop_code, now=datetime.now(tz=TRANSIT_TZ))
+        if not routes:
+            return None
+
+        return {
+            "StopNo": stop_code,
+            "Error": "",
+            "StopDescription": stop["stop_name"],
+            "Routes": {"Route": routes},
+            "Scheduled": True,
+        }
+
+    async def _fetch_trips(self, stop_code: str, /) -> BusStopResponse:
+        raw = await self.api.next_trips(stop_code)
         if self._debug:
             log.info(raw)
 
@@ -970,12 +1980,6 @@ class Transit(commands.Cog):
 
             filtered[i] = self.title(filtered[i])
 
-        # special casing for the routes table, just caches it right here right now
-
-        elif "route_short_name" in columns:
-            global route_colour_cache
-            route_colour_cache[filtered[0]] = tuple(filtered[1:])  # type: ignore
-
         return filtered
 
     def _parse_csv_to_bytesio(self, zipfile: ZipFile, table: str, *columns: str) -> io.BytesIO:
@@ -992,12 +1996,6 @@ class Transit(commands.Cog):
             log.warn("%d column(s) were not found whilst building table '%s'", diff, table)
 
         new_content = ""
-
-        # caching routes
-        if "route_short_name" in columns:
-            global route_colour_cache
-            route_colour_cache.clear()
-
         for row in reader:
             filtered = self._parse_csv_line(row, columns, colindexes)
             if all(i for i in filtered):
@@ -1026,7 +2024,7 @@ class Transit(commands.Cog):
 
         async with self.client.session.get(url) as resp:
             if resp.status == 200:
-                buffer = io.BytesIO(await resp.read())
+                the_zip = io.BytesIO(await resp.read())
             else:
                 colour = PrintColours.RED if resp.status >= 400 else PrintColours.GREEN
                 log.error("could not build gtfs tables (response code: %s%d%s)", colour, resp.status, PrintColours.WHITE)
@@ -1034,13 +2032,23 @@ class Transit(commands.Cog):
                 return False
 
         tables = tuple(include)
-        buffers = await asyncio.to_thread(self._handle_zipfile, buffer, *tables, **include)
+        buffers = await asyncio.to_thread(self._handle_zipfile, the_zip, *tables, **include)
         for filename, buffer in buffers.items():
             try:
                 await self._do_bulk_insert(filename, buffer, *include[filename])
             except Exception:
                 successful = False
 
+        try:
+            await asyncio.to_thread(_build_schedule, the_zip, SCHEDULE_DIR)
+        except Exception as e:
+            log.error("failed building offline schedule: %s", e)
+            successful = False
+
+        # tables that failed to insert were rolled back, so this still picks up a consistent set of data
+        snapshot = await self._load_gtfs()
+        log.info("swapped in gtfs snapshot v%d", snapshot.version)
+
         log.info("gtfs build %s", "complete" if successful else "errored")
         return successful
 
@@ -1048,14 +2056,8 @@ class Transit(commands.Cog):
         if not current:
             return [Choice(name="Enter a stop name...", value="")]
 
-        results: List[StopInfo] = await self.client.db.fetch(stop_search_query(25), current)
-        return [
-            Choice(
-                name=f"{'★  ' if r['stop_name'].endswith(' Stn.') else ''}[{r['stop_code']}] {r['stop_name']}",
-                value=r["stop_code"],
-            )
-            for r in results
-        ]
+        results = self.stops.search(current, limit=25)
+        return [Choice(name=_stop_label(r), value=r["stop_code"]) for r in results]
 
     @command(name="busarrivals", description="oc transpo bus arrivals")
     @describe(stop_or_station="the station or bus stop to view arrivals for")
@@ -1064,8 +2066,9 @@ class Transit(commands.Cog):
         if not stop_or_station:
             return await interaction.response.send_message("?", ephemeral=True)
 
-        if not stop_or_station.isnumeric() or not len(stop_or_station) == 4:
-            top_results: List[StopInfo] = await self.client.db.fetch(stop_search_query(10), stop_or_station)
+        is_stop_code = stop_or_station.isnumeric() and len(stop_or_station) == 4
+        if not is_stop_code and not self.stops.station_codes(stop_or_station):
+            top_results = self.stops.search(stop_or_station, limit=10)
             if not top_results:
                 return await interaction.response.send_message("nothing found...?", ephemeral=True)
 
@@ -1077,7 +2080,7 @@ class Transit(commands.Cog):
 
             view = ResultSelector(
                 top_results,
-                db=self.client.db,
+                stops=self.stops,
                 trip_fetcher=self.fetch_trips,
                 message_editor=interaction.edit_original_response,
                 owner=interaction.user,
@@ -1096,7 +2099,7 @@ class Transit(commands.Cog):
         assert data["Routes"]["Route"] is not None
         view = await BusDisplay(
             data=data,
-            db=self.client.db,
+            stops=self.stops,
             owner=interaction.user,
             trip_fetcher=self.fetch_trips,
         )
@@ -1104,12 +2107,78 @@ class Transit(commands.Cog):
         kwargs = await _view_edit_kwargs(view, as_send=True)
         await interaction.followup.send(**kwargs)
 
+    def _resolve_location(self, location: str, /) -> Tuple[str, float, float] | None:
+        if match := COORDINATES_PATTERN.match(location):
+            lat, lon = float(match["lat"]), float(match["lon"])
+            return f"{lat:.5f}, {lon:.5f}", lat, lon
+
+        # otherwise it's a stop code, or a stop/intersection name (stops are named after the intersection they're at)
+        candidates = [stop] if (stop := self.stops.get(location)) else self.stops.search(location, limit=5)
+        for stop in candidates:
+            try:
+                return stop["stop_name"], float(stop["stop_lat"]), float(stop["stop_lon"])
+            except (TypeError, ValueError):
+                continue
+
+    def _summarize_stop(self, stop: StopInfo, distance: float, data: BusStopResponse | BaseException, /) -> str:
+        header = f"**[`{stop['stop_code']}`] {stop['stop_name']}** — {round(distance)}m"
+        if isinstance(data, OCTranspoError):
+            return f"{header}\n*no upcoming trips*"
+        if isinstance(data, BaseException) or data["Routes"]["Route"] is None:
+            return f"{header}\n*couldn't fetch trips*"
+
+        _, routes_raw = _get_trips_and_routes(data["Routes"]["Route"])
+        departures = []
+        for headsign, route_no, trips in _sort_routes(routes_raw)[:4]:
+            if trips:
+                departures.append(f"`{route_no}` {cap(headsign, 20)} **{trips[0]['AdjustedScheduleTime']}**m")
+
+        return f"{header}\n" + " · ".join(departures)
+
+    @command(name="busnear", description="oc transpo stops closest to a place")
+    @describe(
+        location="a stop, an intersection (eg: bank / somerset), or coordinates (lat, lon)",
+        count="how many stops to show (default 5)",
+    )
+    @autocomplete(location=stop_or_station_autocomplete)
+    async def busnear(self, interaction: Interaction, location: str, count: Range[int, 1, 10] = 5):
+        resolved = self._resolve_location(location)
+        if resolved is None:
+            return await interaction.response.send_message("couldn't figure out where that is", ephemeral=True)
+
+        origin, lat, lon = resolved
+        nearby = self.stops.nearest(lat, lon, limit=count)
+        if not nearby:
+            return await interaction.response.send_message("nothing found...?", ephemeral=True)
+
+        await interaction.response.defer()
+
+        # all of the stops get looked up at once, so this only takes as long as the slowest one
+        results = await asyncio.gather(*(self.fetch_trips(s["stop_code"]) for s, _ in nearby), return_exceptions=True)
+
+        embed = discord.Embed(
+            title=f"Stops near {cap(origin, 200)}",
+            description="\n\n".join(self._summarize_stop(s, d, r) for (s, d), r in zip(nearby, results)),
+            timestamp=datetime.now(),
+        ).set_footer(
+            text=f"{len(nearby)} closest stop(s), as the crow flies", icon_url=getattr(interaction.user.avatar, "url", None)
+        )
+
+        view = ResultSelector(
+            [s for s, _ in nearby],
+            stops=self.stops,
+            trip_fetcher=self.fetch_trips,
+            message_editor=interaction.edit_original_response,
+            owner=interaction.user,
+        )
+        await interaction.followup.send(embed=embed, view=view)
+
     @command(name="routemap", description="view a bus route's map")
     @describe(route="the route number")
     async def routemap(self, interaction: Interaction, route: str):
         route = route.upper()
 
-        if route not in route_colour_cache:
+        if route not in gtfs_data.route_colours:
             msg = f"route **{route}** does not exist"
             return await interaction.response.send_message(msg, ephemeral=True)
 
@@ -1136,11 +2205,22 @@ class Transit(commands.Cog):
         self._debug = not self._debug
         await ctx.reply(f"api debugging {'enabled' if self._debug else 'disabled'}")
 
+    @commands.command(name="buscache", aliases=["bch"])
+    @commands.is_owner()
+    async def buscache(self, ctx: NGKContext, ttl: float | None = None):
+        if ttl is not None:
+            self.trip_cache.ttl = ttl
+
+        stats = "\n".join(f"{k}: {v}" for k, v in self.trip_cache.stats.items())
+        live = "\n".join(f"{k}: {v}" for k, v in self.live_boards.stats.items())
+        api = "\n".join(f"{k}: {v}" for k, v in self.api.stats.items())
+        await ctx.reply(
+            f"trip cache (ttl: {self.trip_cache.ttl}s)\n```yml\n{stats}\n```"
+            f"live boards\n```yml\n{live}\n```"
+            f"api client\n```yml\n{api}\n```"
+            f"gtfs snapshot v{gtfs_data.version}, built {discord.utils.format_dt(gtfs_data.built_at, 'R')}"
+        )
 
-async def setup(client: NotGDKID):
-    global route_colour_cache
-
-    query = "SELECT * FROM routes"
-    route_colour_cache = {r["route_short_name"]: r[1:] for r in await client.db.fetch(query)}
 
+async def setup(client: NotGDKID):
     await client.add_cog(Transit(client=client))
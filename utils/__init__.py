@@ -1,12 +1,16 @@
+from .accounts import *
+from .batching import *
+from .classroom import *
 from .caching import *
 from .checks import *
 from .context import *
+from .coordination import *
 from .emojis import *
 from .enums import *
 from .formatting import *
-from .iterators import *
 from .json import *
 from .misc import *
+from .ratelimits import *
 from .monkeypatching import *
 from .dates import *
 from .typings import *
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Set, Tuple
+
+import aiohttp
+import orjson
+from google.oauth2.credentials import Credentials
+
+from .caching import CoalescingCache
+from .classroom import ClassroomClient
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+    from redis.asyncio import Redis
+
+    from .typings import Course, PostgresPool
+
+CLASSROOM_SCOPES = [
+    "https://www.googleapis.com/auth/classroom.announcements.readonly",
+    "https://www.googleapis.com/auth/classroom.courses.readonly",
+    "https://www.googleapis.com/auth/classroom.courseworkmaterials.readonly",
+    "https://www.googleapis.com/auth/classroom.student-submissions.me.readonly",
+]
+
+REVOKE_CONCURRENCY = 10  # token revoke requests sent to google at once when purging users
+CLASSROOM_CLIENT_TTL = 3600 * 6  # seconds a user's classroom client (and so their credentials) is kept in memory for
+CREDENTIALS_VERSION = "credentials_version:{0}"  # bumped whenever a user's credentials change, in any process
+
+COURSE_CACHE_FRESH = 300  # seconds a cached course list is served without refreshing it
+COURSE_CACHE_TTL = 86400 * 3  # seconds a stale one is still served (while it's refreshed in the background)
+
+
+class CourseCache:
+    """
+    Users' course lists, kept in redis so that they survive restarts and are shared between processes.
+
+    Lists older than `fresh_for` are stale, but are still served right away while they're refreshed in the background.
+    Lists are only dropped once they're older than `keep_for`, or when the user logs out.
+
+    Parameters
+    ----------
+    accounts: `ClassroomAccounts`
+        Whatever's holding the redis connection.
+    fresh_for: `int`
+        Seconds a list is served as is.
+    keep_for: `int`
+        Seconds a list is kept around for at all.
+    """
+
+    KEY = "courses:{0}"
+
+    def __init__(
+        self, accounts: ClassroomAccounts, *, fresh_for: int = COURSE_CACHE_FRESH, keep_for: int = COURSE_CACHE_TTL
+    ) -> None:
+        self.accounts = accounts
+        self.fresh_for = fresh_for
+        self.keep_for = keep_for
+
+        self._refreshing: Dict[int, asyncio.Task[List[Course]]] = {}
+
+    async def get(self, user_id: int, /) -> Tuple[List[Course], bool] | None:
+        """
+        Returns the user's cached courses along with whether they're stale, or `None` if there aren't any.
+        """
+
+        if (raw := await self.accounts.redis.get(self.KEY.format(user_id))) is None:
+            return None
+
+        data = orjson.loads(raw)
+        return data["courses"], time.time() - data["fetched"] > self.fresh_for
+
+    async def set(self, user_id: int, courses: List[Course], /) -> None:
+        data = orjson.dumps({"fetched": time.time(), "courses": courses})
+        await self.accounts.redis.set(self.KEY.format(user_id), data, ex=self.keep_for)
+
+    async def invalidate(self, *user_ids: int) -> None:
+        await self.accounts.redis.delete(*(self.KEY.format(u) for u in user_ids))
+
+    async def fetch(self, user_id: int, classroom: ClassroomClient, /) -> List[Course]:
+        """
+        Fetches the user's courses from google and caches them.
+        """
+
+        courses: List[Course] = []
+        async for page in classroom.courses(pageSize=50):
+            courses += page
+
+        await self.set(user_id, courses)
+        return courses
+
+    def _refresh_done(self, user_id: int, task: asyncio.Task[List[Course]]) -> None:
+        del self._refreshing[user_id]
+
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            # the stale list stays put, it'll be tried again on the next lookup
+            self.accounts.logger.warning("couldn't refresh courses for user %d: %s", user_id, exc)
+
+    def refresh(self, user_id: int, classroom: ClassroomClient, /) -> asyncio.Task[List[Course]]:
+        """
+        Refreshes the user's courses in the background, unless that's already happening.
+        """
+
+        if (task := self._refreshing.get(user_id, None)) is None:
+            task = self._refreshing[user_id] = asyncio.create_task(self.fetch(user_id, classroom))
+            task.add_done_callback(partial(self._refresh_done, user_id))
+
+        return task
+
+    async def refresh_if_stale(self, user_id: int, classroom: ClassroomClient, /) -> None:
+        if (cached := await self.get(user_id)) is not None and not cached[1]:
+            return
+
+        self.refresh(user_id, classroom)
+
+
+class ClassroomAccounts:
+    """
+    Mixin for acting on behalf of the users who've logged in with Google.
+
+    Shared between the bot and the webhook workers, which need to load, refresh and revoke
+    users' credentials the same way. Subclasses provide the connections below, and call
+    `setup_accounts` in their constructor.
+    """
+
+    SCOPES = CLASSROOM_SCOPES
+
+    db: PostgresPool
+    redis: Redis
+    session: aiohttp.ClientSession | None
+    logger: Logger
+
+    classrooms: CoalescingCache[int, ClassroomClient]
+    course_cache: CourseCache
+    _classroom_versions: weakref.WeakKeyDictionary[ClassroomClient, str | None]
+    _credential_writes: Set[asyncio.Task[None]]
+    _table_names: List[str]
+
+    def setup_accounts(self) -> None:
+        # clients refresh their own access tokens, so they outlive the token they were made with
+        self.classrooms = CoalescingCache(CLASSROOM_CLIENT_TTL)
+        self._classroom_versions = weakref.WeakKeyDictionary()
+        self.course_cache = CourseCache(self)
+        self._credential_writes = set()
+
+    @property
+    def table_names(self) -> List[str]:
+        """
+        List[:class:`str`] A list of names of database tables used for various features
+        """
+
+        return self._table_names.copy()
+
+    async def load_table_names(self) -> None:
+        q = """SELECT tablename FROM pg_tables
+                WHERE tableowner = 'gdkid'
+            """
+        self._table_names = [i[0] for i in await self.db.fetch(q)]
+
+    def _save_credentials(self, user_id: int, creds: Credentials) -> None:
+        async def write() -> None:
+            q = """UPDATE authorized SET credentials = $2, expiry = $3
+                    WHERE user_id = $1
+                """
+            try:
+                await self.db.execute(q, user_id, orjson.loads(creds.to_json()), creds.expiry)
+            except Exception as e:
+                # not the end of the world, they'll just need to refresh again next time they're loaded
+                self.logger.warning("couldn't save refreshed credentials for user %d: %s", user_id, e)
+
+        task = asyncio.create_task(write())
+        self._credential_writes.add(task)
+        task.add_done_callback(self._credential_writes.discard)
+
+    async def invalidate_classrooms(self, *user_ids: int) -> None:
+        """
+        Drops the users' cached Classroom clients, in this process as well as every other one
+        (the bot's clusters and the webhook workers), e.g. when they log in or out.
+        """
+
+        if not user_ids:
+            return
+
+        for user_id in user_ids:
+            self.classrooms.invalidate(user_id)
+
+        # outlives any client cached under the old version, so it can't come back around to match one
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(CREDENTIALS_VERSION.format(user_id))
+                pipe.expire(CREDENTIALS_VERSION.format(user_id), CLASSROOM_CLIENT_TTL * 2)
+
+            await pipe.execute()
+
+    async def get_classroom(self, user_id: int) -> ClassroomClient:
+        """
+        Gets a Classroom client for a user, reusing the one from their last request if it's still around.
+
+        The client's credentials are kept in memory along with it, and whenever they're refreshed
+        the new access token is written back to the database in the background. A cached client is
+        only reused if nothing's called `invalidate_classrooms` for the user since it was made.
+
+        Parameters
+        ----------
+        user_id: `int`
+            The ID of the user.
+
+        Raises
+        ------
+        `RuntimeError`
+            The user was not found.
+        """
+
+        # read before the credentials are, so a login or logout landing in between just means loading them again
+        version: str | None = await self.redis.get(CREDENTIALS_VERSION.format(user_id))
+        cached = self.classrooms.peek(user_id)
+        if cached is not None and self._classroom_versions.get(cached, None) != version:
+            self.classrooms.invalidate(user_id)
+
+        async def make_client() -> ClassroomClient:
+            q = """SELECT credentials, expiry FROM authorized
+                    WHERE user_id = $1
+                """
+            if (data := await self.db.fetchrow(q, user_id)) is None:
+                raise RuntimeError("Could not find user.")
+
+            assert self.session is not None
+            creds = Credentials.from_authorized_user_info(data["credentials"], scopes=self.SCOPES)
+            if data["expiry"] is not None:
+                creds.expiry = data["expiry"].replace(tzinfo=None)  # google-auth wants naive utc
+
+            client = ClassroomClient(self.session, creds, on_refresh=partial(self._save_credentials, user_id))
+            self._classroom_versions[client] = version
+            return client
+
+        return await self.classrooms.get(user_id, make_client)
+
+    async def purge_users(
+        self, user_ids: Iterable[int], *, failed_tokens: Mapping[int, str] | None = None
+    ) -> List[int]:
+        """
+        Revokes many users' access at once, on both the bot's end as well as Google's end.
+
+        Everything stored for them is deleted in a single statement (so all of it or none of it goes),
+        then their tokens are all revoked with Google concurrently.
+
+        Parameters
+        ----------
+        user_ids: `Iterable[int]`
+            The IDs of the users to revoke.
+        failed_tokens: `Mapping[int, str] | None`
+            The refresh token that turned out to be dead for each user. When given, users are only purged
+            if that's still the token that's stored for them, so anyone who's logged in again since is left alone.
+
+        Returns
+        -------
+        purge_users: `List[int]`
+            The IDs of the users that were found, and have now been revoked.
+        """
+
+        if not (ids := list(set(user_ids))):
+            return []
+
+        # data-modifying CTEs all run as part of the one statement, whether or not anything reads from them.
+        # only users that were actually logged in get purged, same as when this was done one at a time
+        tables = [t for t in self.table_names if t != "authorized"]
+        purges = "".join(
+            f", purge_{i} AS (DELETE FROM {table} WHERE user_id IN (SELECT user_id FROM gone))"
+            for i, table in enumerate(tables)
+        )
+        if failed_tokens is None:
+            gone = """DELETE FROM authorized
+                    WHERE user_id = ANY($1::bigint[])
+                    RETURNING user_id, credentials"""
+            args: Tuple[Any, ...] = (ids,)
+        else:
+            gone = """DELETE FROM authorized a
+                    USING unnest($1::bigint[], $2::text[]) AS f (user_id, refresh_token)
+                    WHERE a.user_id = f.user_id AND a.credentials->>'refresh_token' = f.refresh_token
+                    RETURNING a.user_id, a.credentials"""
+            args = (ids, [failed_tokens.get(u, "") for u in ids])
+
+        q = f"""WITH gone AS (
+                    {gone}
+                ){purges}
+                SELECT user_id, credentials FROM gone
+            """
+        rows = await self.db.fetch(q, *args)
+        if not rows:
+            return []
+
+        purged = [row["user_id"] for row in rows]
+        await self.course_cache.invalidate(*purged)
+        await self.invalidate_classrooms(*purged)
+
+        assert self.session is not None
+        session = self.session
+        slots = asyncio.Semaphore(REVOKE_CONCURRENCY)
+
+        async def revoke(info: Dict[str, Any]) -> None:
+            # revoking the refresh token takes the whole grant with it, the access token might've expired anyways
+            token = info.get("refresh_token", None) or info.get("token", None)
+            if not token:
+                return
+
+            async with slots:
+                try:
+                    async with session.post(
+                        "https://oauth2.googleapis.com/revoke",
+                        data={"token": token},
+                        headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    ):
+                        pass
+                except aiohttp.ClientError:
+                    pass  # their data's already gone on our end, and google expires unused grants eventually
+
+        await asyncio.gather(*(revoke(row["credentials"]) for row in rows))
+        return purged
+
+    async def remove_access(self, user_id: int):
+        """
+        Revokes a user's access on both the bot's end as well as Google's end.
+
+        Parameters
+        ----------
+        user_id: `int`
+            The ID of the user to revoke.
+
+        Raises
+        ------
+        `RuntimeError`
+            The user was not found.
+        """
+
+        if not await self.purge_users((user_id,)):
+            raise RuntimeError("Could not find user.")
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, List, Sequence, Set, Tuple, TypeVar
+
+RT = TypeVar("RT")
+
+GOOGLE_BATCH_LIMIT = 50  # most calls the classroom api accepts in a single batch request
+
+
+class GoogleBatcher(Generic[RT]):
+    """
+    Coalesces Google API requests into batch requests.
+
+    Requests passed to `execute` around the same time (within `delay` seconds of each other) are sent off
+    together as a single multipart HTTP request, instead of one round trip each.
+    Each request still succeeds or fails on its own.
+
+    Parameters
+    ----------
+    send: `Callable[[Sequence[RT]], Awaitable[List[Any]]]`
+        Sends a batch of requests, returning each one's response (or the exception it failed with) in order.
+        Raising fails every request in the batch.
+    limit: `int`
+        The most requests sent in one batch, anything past this goes into the next one.
+    delay: `float`
+        How long to wait for more requests to come in before sending a batch.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Sequence[RT]], Awaitable[List[Any]]],
+        *,
+        limit: int = GOOGLE_BATCH_LIMIT,
+        delay: float = 0.05,
+    ):
+        self.send = send
+        self.limit = limit
+        self.delay = delay
+
+        self.batches_sent = 0
+        self.requests_sent = 0
+
+        self._pending: List[Tuple[RT, asyncio.Future[Any]]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._sending: Set[asyncio.Task[None]] = set()
+
+    async def execute(self, request: RT) -> Any:
+        """
+        Queues up a request to be sent in the next batch, and returns its response once it comes back.
+        Raises whatever this request failed with, if it did.
+        """
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        self._pending.append((request, future))
+
+        if len(self._pending) >= self.limit:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.limit):
+            task = asyncio.create_task(self._send(pending[i : i + self.limit]))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, items: List[Tuple[RT, asyncio.Future[Any]]], /) -> None:
+        try:
+            results = await self.send([request for request, _ in items])
+        except Exception as e:
+            # the whole batch went down, eg: the credentials couldn't be refreshed
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+            return
+
+        self.batches_sent += 1
+        self.requests_sent += len(items)
+
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue  # whoever was waiting on this one gave up
+
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
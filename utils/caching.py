@@ -1,5 +1,6 @@
+import asyncio
 import time
-from typing import Any, Generic, Tuple, TypeVar
+from typing import Any, Awaitable, Callable, Dict, Generic, Tuple, TypeVar
 
 KT = TypeVar("KT")
 VT = TypeVar("VT")
@@ -91,3 +92,108 @@ class ExpiringDict(dict, Generic[KT, VT]):
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({super().__repr__()})"
+
+
+class CoalescingCache(Generic[KT, VT]):
+    """
+    Async cache in which results are kept for a short time, and concurrent lookups
+    for the same key all await one single in-flight fetch rather than each making their own.
+
+    Parameters
+    ----------
+    ttl: `float`
+        The time in seconds that a fetched value will be served from the cache.
+    maxsize: `int`
+        The amount of stored values at which expired entries start getting pruned.
+
+    Attributes
+    ----------
+    hits: `int`
+        Lookups that were served straight from the cache.
+    misses: `int`
+        Lookups that had to run the fetch.
+    coalesced: `int`
+        Lookups that piggybacked off of a fetch that was already in progress.
+    """
+
+    def __init__(self, ttl: float, *, maxsize: int = 512):
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._values: Dict[KT, Tuple[VT, float]] = {}
+        self._pending: Dict[KT, asyncio.Task[VT]] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stored": len(self._values),
+            "in_flight": len(self._pending),
+        }
+
+    def peek(self, key: KT) -> VT | None:
+        """
+        Returns the cached value for `key` if it hasn't expired yet, without fetching or touching the counters.
+        """
+
+        item = self._values.get(key, None)
+        if item is not None and time.monotonic() - item[1] < self.ttl:
+            return item[0]
+
+    def put(self, key: KT, value: VT) -> None:
+        self._values[key] = (value, time.monotonic())
+
+        if len(self._values) > self.maxsize:
+            now = time.monotonic()
+            for k in tuple(k for (k, (_, t)) in self._values.items() if now - t >= self.ttl):
+                del self._values[k]
+
+    def invalidate(self, key: KT) -> None:
+        self._values.pop(key, None)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    async def _run(self, key: KT, fetcher: Callable[[], Awaitable[VT]]) -> VT:
+        try:
+            value = await fetcher()
+        finally:
+            del self._pending[key]
+
+        self.put(key, value)
+        return value
+
+    async def get(self, key: KT, fetcher: Callable[[], Awaitable[VT]]) -> VT:
+        """
+        Returns the value stored for `key`, running `fetcher` to obtain it if there isn't a fresh one.
+
+        Exceptions raised by `fetcher` are propagated to every caller waiting on it, and are never cached.
+        """
+
+        value = self.peek(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._pending.get(key, None)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._run(key, fetcher))
+
+            # stops asyncio from complaining if every waiter got cancelled before the fetch errored
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._pending[key] = task
+        else:
+            self.coalesced += 1
+
+        # shielded so that one caller cancelling doesn't cancel the fetch for everybody else
+        return await asyncio.shield(task)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(ttl={self.ttl}, {self.stats})"
@@ -23,11 +23,13 @@ def is_logged_in():
         client: Amaze = interaction.client  # type: ignore
         user_id: int = interaction.user.id
 
-        q = """SELECT credentials FROM authorized
-                WHERE user_id = $1
-            """
-        interaction.extras["credentials"] = await client.db.fetchval(q, user_id)
-        return interaction.extras["credentials"] is not None
+        # only hits the database if their credentials aren't already loaded, or were logged out of anywhere else
+        try:
+            interaction.extras["classroom"] = await client.get_classroom(user_id)
+        except RuntimeError:
+            return False
+
+        return True
 
     return check(predicate)
 
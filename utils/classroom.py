@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Sequence, Tuple
+from urllib.parse import urlencode
+
+import aiohttp
+import httplib2
+import orjson
+from google.auth.exceptions import RefreshError, TransportError
+from googleapiclient.errors import HttpError
+
+from .batching import GoogleBatcher
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+    from .typings import Announcement, Course, CourseWork, CourseWorkMaterials, StudentSubmissions
+
+CLASSROOM_API = "https://classroom.googleapis.com"
+TOKEN_EXPIRY_LEEWAY = 60  # seconds, refresh a little early rather than have a request fail halfway through
+REFRESH_RETRIES = 3  # extra attempts at refreshing a token when google's having a moment
+REFRESH_BACKOFF = 1  # seconds before the first retry, doubled after each one
+
+GetRequest = Tuple[str, Dict[str, Any]]
+
+
+class ClassroomHTTPError(HttpError):
+    """
+    A request to the Classroom API failed.
+
+    Subclasses googleapiclient's `HttpError`, so anything that handled errors from the sync client
+    (e.g. by checking `status_code`) handles these the same way.
+    """
+
+    def __init__(self, status: int, reason: str, content: bytes, uri: str) -> None:
+        super().__init__(httplib2.Response({"status": status, "reason": reason}), content, uri=uri)
+
+
+class ClassroomClient:
+    """
+    Async Google Classroom client, over an existing `aiohttp.ClientSession`.
+
+    Requests from every client share the session's connection pool, rather than each taking up a thread
+    like the sync googleapiclient does. Access tokens are refreshed by the client itself, and the given
+    credentials object is updated in place when that happens.
+
+    Parameters
+    ----------
+    session: `aiohttp.ClientSession`
+        The session to make requests with.
+    credentials: `Credentials`
+        The user's credentials.
+    on_refresh: `Callable[[Credentials], Any] | None`
+        Called with the credentials whenever they get a new access token, e.g. to save it somewhere.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        credentials: Credentials,
+        *,
+        on_refresh: Callable[[Credentials], Any] | None = None,
+    ) -> None:
+        self.session = session
+        self.credentials = credentials
+        self.on_refresh = on_refresh
+
+        self.batcher: GoogleBatcher[GetRequest] = GoogleBatcher(self._send_batch)
+        self._refresh_lock = asyncio.Lock()
+
+    # <-- auth -->
+
+    @property
+    def token_expired(self) -> bool:
+        creds = self.credentials
+        if not creds.token:
+            return True
+        if creds.expiry is None:
+            return False
+
+        return creds.expiry - timedelta(seconds=TOKEN_EXPIRY_LEEWAY) <= datetime.utcnow()
+
+    async def refresh(self, *, force: bool = False) -> None:
+        """
+        Gets a new access token using the refresh token.
+
+        Raises
+        ------
+        `RefreshError`
+            The refresh token's been revoked or expired, or the credentials can't be refreshed at all.
+        `TransportError`
+            Google couldn't be reached, or didn't give us a token for some other reason. The grant's
+            probably fine, so this shouldn't be treated like the user logged out.
+        """
+
+        stale_token = self.credentials.token
+        async with self._refresh_lock:
+            if self.credentials.token != stale_token or not force and not self.token_expired:
+                return  # someone else got to it first
+
+            creds = self.credentials
+            if not (creds.refresh_token and creds.client_id and creds.client_secret):
+                raise RefreshError("credentials are missing the fields needed to refresh them")
+
+            data = {
+                "grant_type": "refresh_token",
+                "refresh_token": creds.refresh_token,
+                "client_id": creds.client_id,
+                "client_secret": creds.client_secret,
+            }
+            payload = await self._request_token(creds.token_uri, data)
+            creds.token = payload["access_token"]
+            creds.expiry = datetime.utcnow() + timedelta(seconds=payload.get("expires_in", 3600))
+
+            if self.on_refresh is not None:
+                self.on_refresh(creds)
+
+    async def _request_token(self, token_uri: str, data: Dict[str, str]) -> Dict[str, Any]:
+        for attempt in range(REFRESH_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(REFRESH_BACKOFF * 2 ** (attempt - 1))
+
+            try:
+                async with self.session.post(token_uri, data=data) as resp:
+                    status, raw = resp.status, await resp.read()
+            except aiohttp.ClientError as e:
+                error: str = f"couldn't reach the token endpoint: {e}"
+                continue
+
+            try:
+                payload = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                payload = {}
+
+            if status == 200 and "access_token" in payload:
+                return payload
+            if status in (400, 401) and payload.get("error", None) == "invalid_grant":
+                # the only answer that actually means the refresh token's dead
+                raise RefreshError(payload.get("error_description", "invalid_grant"), payload)
+
+            error = f"token endpoint responded with {status}: {payload.get('error', raw[:200])!r}"
+            if status != 429 and status < 500:
+                break  # retrying won't change anything, but it's not the user's grant that's the problem either
+
+        raise TransportError(error)
+
+    async def _headers(self) -> Dict[str, str]:
+        if self.token_expired:
+            await self.refresh()
+
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    # <-- requests -->
+
+    async def get(self, path: str, /, *, batch: bool = False, **params: Any) -> Dict[str, Any]:
+        """
+        Makes a GET request to the Classroom API, e.g. `get("courses", pageSize=50)`.
+
+        Parameters
+        ----------
+        path: `str`
+            The resource path, relative to `/v1/`.
+        batch: `bool`
+            Whether this request can wait a moment to be sent along with others in a batch request.
+        **params: `Any`
+            The query parameters.
+
+        Raises
+        ------
+        `ClassroomHTTPError`
+            The request failed.
+        `RefreshError`
+            The credentials couldn't be refreshed.
+        `TransportError`
+            The credentials needed refreshing, but google couldn't be reached to do that.
+        """
+
+        if batch:
+            return await self.batcher.execute((path, params))
+
+        url = f"{CLASSROOM_API}/v1/{path}"
+        for retry in (True, False):
+            async with self.session.get(url, params=params, headers=await self._headers()) as resp:
+                content = await resp.read()
+                if resp.status == 401 and retry:
+                    await self.refresh(force=True)  # revoked early or clock skew, try once more with a fresh one
+                    continue
+                if resp.status >= 400:
+                    raise ClassroomHTTPError(resp.status, resp.reason or "", content, str(resp.url))
+
+                return orjson.loads(content)
+
+        raise AssertionError("unreachable")
+
+    async def _send_batch(self, requests: Sequence[GetRequest], /) -> List[Any]:
+        with aiohttp.MultipartWriter("mixed") as writer:
+            for idx, (path, params) in enumerate(requests):
+                query = f"?{urlencode(params, doseq=True)}" if params else ""
+                writer.append(
+                    f"GET /v1/{path}{query} HTTP/1.1\r\n",
+                    {"Content-Type": "application/http", "Content-ID": f"<item{idx}>"},
+                )
+
+        results: List[Any] = [RuntimeError("no response in batch")] * len(requests)
+        for retry in (True, False):
+            async with self.session.post(f"{CLASSROOM_API}/batch", data=writer, headers=await self._headers()) as resp:
+                if resp.status == 401 and retry:
+                    await self.refresh(force=True)
+                    continue
+                if resp.status >= 400:
+                    raise ClassroomHTTPError(resp.status, resp.reason or "", await resp.read(), str(resp.url))
+
+                reader = aiohttp.MultipartReader.from_response(resp)
+                while (part := await reader.next()) is not None:
+                    content_id = part.headers.get("Content-ID", "")  # type: ignore
+                    raw: bytes = await part.read()  # type: ignore
+
+                    try:
+                        idx = int(content_id.strip("<>").rpartition("item")[-1])
+                        path = requests[idx][0]
+                    except (ValueError, IndexError):
+                        continue
+
+                    # each part is a whole HTTP response of its own
+                    head, _, body = raw.partition(b"\r\n\r\n")
+                    status_line = head.split(b"\r\n", 1)[0].decode()
+                    _, status, reason = (status_line.split(" ", 2) + [""])[:3]
+                    if int(status) >= 400:
+                        results[idx] = ClassroomHTTPError(int(status), reason, body, f"{CLASSROOM_API}/v1/{path}")
+                    else:
+                        results[idx] = orjson.loads(body)
+
+                return results
+
+        raise AssertionError("unreachable")
+
+    async def pages(self, path: str, key: str, /, *, batch: bool = False, **params: Any) -> AsyncIterator[List[Any]]:
+        """
+        Yields each page of a list endpoint's results, fetching the next page only once the previous one's been used.
+
+        Parameters
+        ----------
+        path: `str`
+            The resource path, relative to `/v1/`.
+        key: `str`
+            The key the results are found under in the response, e.g. `"courses"`.
+        batch: `bool`
+            Whether the page requests can be sent in batch requests.
+        **params: `Any`
+            The query parameters.
+        """
+
+        while True:
+            data = await self.get(path, batch=batch, **params)
+            yield data.get(key, [])
+
+            if not (next_page := data.get("nextPageToken", None)):
+                return
+
+            params["pageToken"] = next_page
+
+    # <-- resources -->
+
+    def courses(self, **params: Any) -> AsyncIterator[List[Course]]:
+        return self.pages("courses", "courses", **params)
+
+    def course_work(self, course_id: int | str, /, **params: Any) -> AsyncIterator[List[CourseWork]]:
+        return self.pages(f"courses/{course_id}/courseWork", "courseWork", **params)
+
+    def announcements(self, course_id: int | str, /, **params: Any) -> AsyncIterator[List[Announcement]]:
+        return self.pages(f"courses/{course_id}/announcements", "announcements", **params)
+
+    def course_work_materials(self, course_id: int | str, /, **params: Any) -> AsyncIterator[List[CourseWorkMaterials]]:
+        return self.pages(f"courses/{course_id}/courseWorkMaterials", "courseWorkMaterial", **params)
+
+    def student_submissions(
+        self, course_id: int | str, course_work_id: str, /, **params: Any
+    ) -> AsyncIterator[List[StudentSubmissions]]:
+        path = f"courses/{course_id}/courseWork/{course_work_id}/studentSubmissions"
+        return self.pages(path, "studentSubmissions", **params)
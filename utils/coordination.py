@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import math
+import os
+import socket
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Collection, Dict, Iterable, List, Set
+
+import orjson
+
+if TYPE_CHECKING:
+    from discord import Guild
+    from redis.asyncio import Redis
+
+# only touch a key if we're still the ones holding it
+_EXTEND = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+# only forget a guild's owner if it was put there by this shard, it might've moved to another since
+_FORGET_GUILD = """
+if redis.call("HGET", KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call("HDEL", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class ShardLeases:
+    """
+    Splits a fixed number of shards of work between however many processes are running, through redis.
+
+    Every process heartbeats into a shared set of live workers, and holds leases on the shards it owns,
+    which expire unless they're renewed by the next heartbeat. That way a worker that dies has its shards
+    picked up by the others within a lease, and each worker only takes its fair share of them, so a worker
+    that joins gets some handed over on the others' next heartbeats.
+
+    Parameters
+    ----------
+    redis: `Redis`
+        The redis connection.
+    name: `str`
+        The namespace the keys go under.
+    shards: `int`
+        How many shards the work is split into.
+    lease: `float`
+        Seconds a lease lasts without being renewed. Heartbeats should happen a few times within this.
+    worker_id: `str | None`
+        Identifies this worker, generated from the host and pid if not given.
+    """
+
+    def __init__(self, redis: Redis, name: str, shards: int, *, lease: float = 30, worker_id: str | None = None):
+        self.redis = redis
+        self.name = name
+        self.shards = shards
+        self.lease = lease
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self.owned: Set[int] = set()
+
+        self._extend = redis.register_script(_EXTEND)
+        self._release = redis.register_script(_RELEASE)
+
+    @property
+    def workers_key(self) -> str:
+        return f"{self.name}:workers"
+
+    def shard_key(self, shard: int) -> str:
+        return f"{self.name}:shard:{shard}"
+
+    async def live_workers(self) -> List[str]:
+        """
+        Returns the IDs of the workers that have heartbeated within the last lease.
+        """
+
+        return await self.redis.zrangebyscore(self.workers_key, time.time() - self.lease, "+inf")
+
+    async def heartbeat(self) -> Set[int]:
+        """
+        Marks this worker as alive, renews its leases, and rebalances its shards towards its fair share.
+        Returns the shards this worker owns now.
+        """
+
+        now = time.time()
+        await self.redis.zadd(self.workers_key, {self.worker_id: now})
+        await self.redis.zremrangebyscore(self.workers_key, "-inf", now - self.lease)
+
+        live = max(1, await self.redis.zcard(self.workers_key))
+        fair_share = math.ceil(self.shards / live)
+        lease_ms = int(self.lease * 1000)
+
+        for shard in tuple(self.owned):
+            if not await self._extend(keys=[self.shard_key(shard)], args=[self.worker_id, lease_ms]):
+                self.owned.discard(shard)  # it expired and somebody else took it
+
+        while len(self.owned) > fair_share:
+            shard = self.owned.pop()
+            await self._release(keys=[self.shard_key(shard)], args=[self.worker_id])
+
+        # start looking from a different spot per worker, so they're not all fighting over the same shards
+        offset = hash(self.worker_id) % self.shards
+        for i in range(self.shards):
+            if len(self.owned) >= fair_share:
+                break
+
+            shard = (offset + i) % self.shards
+            if shard in self.owned:
+                continue
+
+            if await self.redis.set(self.shard_key(shard), self.worker_id, nx=True, px=lease_ms):
+                self.owned.add(shard)
+
+        return self.owned
+
+    async def claim_window(self, shards: Collection[int], period: float) -> List[int]:
+        """
+        Claims the job for each of these shards for the current window of `period` seconds.
+        Returns the shards whose jobs were claimed, nobody else will get those ones until the next window.
+
+        This is on top of the leases, so even if two workers think they own a shard for a moment
+        (or the bot's covering for there being no workers), each window only gets run once.
+        """
+
+        window = int(time.time() // period)
+        claimed: List[int] = []
+        for shard in shards:
+            key = f"{self.name}:job:{shard}:{window}"
+            if await self.redis.set(key, self.worker_id, nx=True, ex=math.ceil(period)):
+                claimed.append(shard)
+
+        return claimed
+
+    async def publish(self, status: Dict[str, Any], *, ttl: float) -> None:
+        """
+        Shares this worker's status, e.g. stats on the last thing it did.
+        """
+
+        await self.redis.set(f"{self.name}:status:{self.worker_id}", orjson.dumps(status), ex=math.ceil(ttl))
+
+    async def statuses(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the published statuses of the live workers.
+        """
+
+        statuses: Dict[str, Dict[str, Any]] = {}
+        for worker_id in await self.live_workers():
+            if (raw := await self.redis.get(f"{self.name}:status:{worker_id}")) is not None:
+                statuses[worker_id] = orjson.loads(raw)
+
+        return statuses
+
+    async def release_all(self) -> None:
+        """
+        Gives up every shard this worker owns and leaves the set of live workers, e.g. when shutting down.
+        """
+
+        for shard in self.owned:
+            await self._release(keys=[self.shard_key(shard)], args=[self.worker_id])
+
+        self.owned.clear()
+        await self.redis.zrem(self.workers_key, self.worker_id)
+
+
+class GuildDirectory:
+    """
+    Which guilds are on which shard, and who owns them, kept in redis so every process can count them.
+
+    When the bot's shards are split between processes, each one only has its own shards' guilds cached,
+    so anything counted over all of them (e.g. the bot's total, or how many guilds someone owns)
+    is counted here instead.
+
+    Each shard's guilds are stored as `{name}:shard:{shard}` (guild ID -> owner ID), and each owner's
+    as `{name}:owner:{owner}` (guild ID -> shard ID). A shard rewrites its own entries whenever it
+    connects, so anything that changed while it was offline gets fixed up then.
+
+    Parameters
+    ----------
+    redis: `Redis`
+        The redis connection.
+    name: `str`
+        The namespace the keys go under.
+    """
+
+    def __init__(self, redis: Redis, name: str) -> None:
+        self.redis = redis
+        self.name = name
+
+        self._forget = redis.register_script(_FORGET_GUILD)
+
+    def shard_key(self, shard: int) -> str:
+        return f"{self.name}:shard:{shard}"
+
+    def owner_key(self, owner_id: int) -> str:
+        return f"{self.name}:owner:{owner_id}"
+
+    async def sync_shard(self, shard: int, guilds: Iterable[Guild]) -> None:
+        """
+        Replaces everything stored for this shard with the guilds it has now.
+        """
+
+        current = {guild.id: guild.owner_id or 0 for guild in guilds}
+        previous: Dict[str, str] = await self.redis.hgetall(self.shard_key(shard))
+
+        for guild_id, owner_id in previous.items():
+            if int(owner_id) and current.get(int(guild_id), None) != int(owner_id):
+                await self._forget(keys=[self.owner_key(int(owner_id))], args=[guild_id, shard])
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.shard_key(shard))
+            if current:
+                pipe.hset(self.shard_key(shard), mapping=current)  # type: ignore
+            for guild_id, owner_id in current.items():
+                if owner_id:
+                    pipe.hset(self.owner_key(owner_id), str(guild_id), shard)
+
+            await pipe.execute()
+
+    async def add(self, guild: Guild) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.shard_key(guild.shard_id), str(guild.id), guild.owner_id or 0)
+            if guild.owner_id is not None:
+                pipe.hset(self.owner_key(guild.owner_id), str(guild.id), guild.shard_id)
+
+            await pipe.execute()
+
+    async def remove(self, guild: Guild) -> None:
+        await self.redis.hdel(self.shard_key(guild.shard_id), str(guild.id))
+        if guild.owner_id is not None:
+            await self._forget(keys=[self.owner_key(guild.owner_id)], args=[guild.id, guild.shard_id])
+
+    async def owned_by(self, owner_id: int) -> int:
+        """
+        Returns how many guilds the bot's in that are owned by this user, on any shard.
+        """
+
+        return await self.redis.hlen(self.owner_key(owner_id))
+
+    async def count(self, shard_count: int) -> int:
+        """
+        Returns how many guilds the bot's in over every shard.
+        """
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for shard in range(shard_count):
+                pipe.hlen(self.shard_key(shard))
+
+            return sum(await pipe.execute())
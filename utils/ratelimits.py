@@ -0,0 +1,193 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class TokenBucket:
+    """
+    Async token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second, up to `capacity`.
+    Waiters are served in the order they arrived.
+
+    Parameters
+    ----------
+    rate: `float`
+        Tokens added per second.
+    capacity: `float`
+        The most tokens that can be saved up, i.e. the largest allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        Waits until a token is available and takes it.
+        Returns how long was spent waiting, which is exactly `0.0` if a token was free straight away.
+
+        Cancelling this while it waits (e.g. through `asyncio.wait_for`) doesn't use up a token.
+        """
+
+        start = time.monotonic()
+        waited = self._lock.locked()  # somebody ahead of us is already waiting on a token
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                waited = True
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+
+            self._tokens -= 1
+
+        return time.monotonic() - start if waited else 0.0
+
+
+class CircuitOpen(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = retry_after
+        super().__init__(f"circuit open, retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while whatever's behind it is down.
+
+    After `threshold` consecutive failures the breaker opens, and every call is rejected for `reset_after` seconds.
+    Then a single trial call is let through (half-open): if it succeeds the breaker closes again,
+    otherwise it goes back to being open.
+
+    Parameters
+    ----------
+    threshold: `int`
+        Consecutive failures before the breaker opens.
+    reset_after: `float`
+        Seconds to stay open before letting a trial call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.times_opened = 0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return self.OPEN
+
+        return self.HALF_OPEN
+
+    def check(self) -> None:
+        """
+        Raises `CircuitOpen` if a call shouldn't be made right now.
+        Every call that passes this must be followed up with `record_success` or `record_failure`.
+        """
+
+        state = self.state
+        if state == self.OPEN:
+            assert self.opened_at is not None
+            raise CircuitOpen(self.reset_after - (time.monotonic() - self.opened_at))
+
+        if state == self.HALF_OPEN:
+            if self._trial_running:
+                raise CircuitOpen(0)
+
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def release(self) -> None:
+        """
+        Gives up on a call that passed `check` without recording an outcome, e.g. if it was cancelled.
+        """
+
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_running or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.times_opened += 1
+
+            self.opened_at = time.monotonic()
+
+        self._trial_running = False
+
+
+class LatencyTracker:
+    """
+    Keeps the latencies and outcomes of the last `size` calls, for debugging purposes.
+
+    Parameters
+    ----------
+    size: `int`
+        How many of the most recent calls to keep.
+    """
+
+    def __init__(self, size: int = 200):
+        self.total = 0
+        self.total_errors = 0
+
+        self._latencies: Deque[float] = deque(maxlen=size)
+        self._errors: Deque[bool] = deque(maxlen=size)
+
+    def record(self, latency: float, *, error: bool = False) -> None:
+        self.total += 1
+        self.total_errors += error
+
+        self._latencies.append(latency)
+        self._errors.append(error)
+
+    def percentile(self, pct: float) -> float:
+        if not self._latencies:
+            return 0.0
+
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._errors) / len(self._errors) if self._errors else 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.total,
+            "errors": self.total_errors,
+            "recent_error_rate": round(self.error_rate, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1),
+        }
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-from googleapiclient.discovery import HttpRequest
-
 from datetime import datetime
-from typing import Any, Dict, List, Literal, Protocol, Type, TypedDict, TYPE_CHECKING
+from typing import Any, Dict, List, Literal, NotRequired, Protocol, Type, TypedDict, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from asyncpg import Connection
@@ -54,26 +52,6 @@ class PostgresPool(Protocol):
         ...
 
 
-class Resource(Protocol):
-    def courses(self) -> Resource:
-        ...
-
-    def announcements(self) -> Resource:
-        ...
-
-    def courseWorkMaterials(self) -> Resource:
-        ...
-
-    def courseWork(self) -> Resource:
-        ...
-
-    def studentSubmissions(self) -> Resource:
-        ...
-
-    def list(self, **kwargs: str | int) -> HttpRequest:
-        ...
-
-
 class Secrets(TypedDict):
     token: str
     testing_token: str
@@ -126,6 +104,7 @@ class BusStopResponse(TypedDict):
     Error: str
     StopDescription: str
     Routes: Dict[Literal["Route"], List[RouteData] | None] | Dict[Literal["Route"], RouteData | None]
+    Scheduled: NotRequired[bool]  # not from the API, set when the data came from the offline schedule instead
 
 
 class Tracks(TypedDict):
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+# <-- stdlib imports -->
+import asyncio
+import logging
+import sys
+from typing import TYPE_CHECKING
+
+# <-- database imports -->
+import asyncpg
+from redis import asyncio as aioredis
+
+# <-- other imports -->
+import aiohttp
+import orjson
+
+# <-- local imports -->
+from cogs.webhooks import POLL_INTERVAL, POLL_LEASES, POLL_SHARDS, WebhookPoller
+from utils import ClassroomAccounts, GClassLogging, PrintColours, ShardLeases, db_init
+
+# <-- type checking -->
+if TYPE_CHECKING:
+    from utils import PostgresPool, Secrets
+
+# <-- uvloop -->
+try:
+    import uvloop  # type: ignore
+except (ModuleNotFoundError, ImportError):
+    pass
+else:
+    uvloop.install()
+
+# <-- load secrets file -->
+with open("config/secrets.json", "r") as f:
+    secrets: Secrets = orjson.loads(f.read())
+
+HEARTBEAT_INTERVAL = 10  # seconds between heartbeats, a few of these fit into a lease
+LEASE = 30  # seconds a worker's shards stay theirs without a heartbeat
+TICK = 15  # seconds between checks for shards whose poll for this window hasn't been claimed yet
+
+
+class WebhookWorker(ClassroomAccounts):
+    """
+    Runs the webhook poller (and delivery) outside of the bot's process.
+
+    Any number of these can run at once, they split the shards of webhooks between themselves through redis.
+    A cycle that takes a while here doesn't hold up the bot's gateway connection or interactions.
+    While there's at least one of these running, the bot doesn't poll at all.
+    """
+
+    logger = logging.getLogger("webhook_worker")
+
+    token = secrets["testing_token"] if sys.platform == "win32" else secrets["token"]
+    postgres_dns = secrets["postgres_dns"] + "amaze"
+    redis_dns = f"redis://{secrets['vps_ip']}"
+
+    def __init__(self) -> None:
+        self.session: aiohttp.ClientSession | None = None
+        self.setup_accounts()
+
+    @property
+    def db(self) -> PostgresPool:
+        return self._db  # type: ignore
+
+    async def heartbeat(self) -> None:
+        while True:
+            try:
+                await self.leases.heartbeat()
+            except Exception as e:
+                # if this keeps up our leases run out, and the other workers take over
+                self.logger.error("heartbeat failed: %s", e)
+
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def poll(self) -> None:
+        while True:
+            try:
+                # the heartbeat changes which shards we own while this is running, so work off a copy
+                if shards := await self.leases.claim_window(tuple(self.leases.owned), POLL_INTERVAL * 60):
+                    await self.poller.run_cycle(shards)
+
+                    stats = {**self.poller.last_cycle, "shards": sorted(shards)}
+                    await self.leases.publish(stats, ttl=POLL_INTERVAL * 60 * 2)
+            except Exception as e:
+                # redis hiccups and the like, the next tick tries again
+                self.logger.error("error running poll tick: %s", e)
+
+            await asyncio.sleep(TICK)
+
+    async def start(self) -> None:
+        self.session = aiohttp.ClientSession()
+        self._db = await asyncpg.create_pool(self.postgres_dns, init=db_init)
+        self.redis = aioredis.from_url(
+            self.redis_dns,
+            password=secrets["redis_password"],
+            port=6379,
+            encoding="utf-8",
+            decode_responses=True,
+            socket_connect_timeout=60.0,
+            socket_timeout=60.0,
+        )
+        await self.load_table_names()
+
+        self.poller = WebhookPoller(self)
+        self.leases = ShardLeases(self.redis, POLL_LEASES, POLL_SHARDS, lease=LEASE)
+        self.logger.info("%sstarted worker %s", PrintColours.GREEN, self.leases.worker_id)
+
+        try:
+            await asyncio.gather(self.heartbeat(), self.poll())
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        # hand our shards over straight away, instead of the others waiting for our leases to run out
+        await self.leases.release_all()
+        self.poller.dispatcher.close()
+
+        assert self.session is not None
+        await self.session.close()
+        await self.db.close()
+        await self.redis.close()
+
+    def run(self) -> None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(GClassLogging())
+        logging.basicConfig(handlers=[handler], level=logging.INFO)
+
+        try:
+            asyncio.run(self.start())
+        except KeyboardInterrupt:
+            return
+        finally:
+            self.logger.info("%sworker stopped", PrintColours.PURPLE)
+
+
+if __name__ == "__main__":
+    WebhookWorker().run()